@@ -1,7 +1,31 @@
 import torch
 import os
-from diffusers import StableDiffusionPipeline
-from PIL import Image
+import json
+import time
+from contextlib import contextmanager, nullcontext
+import numpy as np
+from diffusers import StableDiffusionPipeline, DPMSolverMultistepScheduler
+from PIL import Image, ImageFilter
+from modelregistry import registry
+from promptcache import sd_prompt_embeds
+
+SD_MODEL = "CompVis/stable-diffusion-v1-4"
+
+# Per-request speed/quality trade-offs for CPU hosts. "default" is the stock pipeline; the
+# others are separate registry entries with a few-step DPM-Solver++ scheduler, bf16 autocast
+# (only where the CPU supports bf16), channels_last UNet weights and optionally torch.compile.
+# Measure them with benchmark_profiles().
+PERFORMANCE_PROFILES = {
+    "default": {},
+    "cpu-fast": {"scheduler": "dpm++", "steps": 15, "bf16": True, "channels_last": True},
+    "cpu-fast-compiled": {"scheduler": "dpm++", "steps": 15, "bf16": True, "channels_last": True, "compile": True},
+}
+# 0 means the default: one intra-op thread per physical core and a single inter-op thread,
+# since the pipeline runs one denoising step at a time.
+TORCH_THREADS = int(os.environ.get("HYPERGEN_TORCH_THREADS", "0"))
+TORCH_INTEROP_THREADS = int(os.environ.get("HYPERGEN_TORCH_INTEROP_THREADS", "0"))
+
+_threads_configured = False
 
 def ensure_temp_dir():
     temp_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp")
@@ -10,9 +34,117 @@ def ensure_temp_dir():
     return temp_dir
 
 def download_model():
-    return StableDiffusionPipeline.from_pretrained("CompVis/stable-diffusion-v1-4", torch_dtype=torch.float32  )
+    return StableDiffusionPipeline.from_pretrained(SD_MODEL, torch_dtype=torch.float32  )
+
+def load_pipeline(device="cpu"):
+    configure_threads()
+    pipe = download_model().to(device)
+    pipe.set_progress_bar_config(disable=True)
+    return pipe
+
+def preload_models():
+    """Starts building the pipeline in the background at app start."""
+    configure_threads()
+    return registry.preload_in_background([SD_MODEL])
+
+def cpu_supports_bf16():
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except Exception:
+        return False
+
+def physical_core_count():
+    """Physical cores via psutil when it's installed, otherwise the logical CPU count."""
+    try:
+        import psutil
+        cores = psutil.cpu_count(logical=False)
+    except ImportError:
+        cores = None
+    return cores or os.cpu_count() or 1
+
+def configure_threads():
+    """
+    Sets torch's intra-op threads to the physical core count and inter-op threads to 1, once per
+    process. HYPERGEN_TORCH_THREADS / HYPERGEN_TORCH_INTEROP_THREADS override either.
+    """
+    global _threads_configured
+    if _threads_configured:
+        return
+    _threads_configured = True
+    torch.set_num_threads(TORCH_THREADS or physical_core_count())
+    try:
+        torch.set_num_interop_threads(TORCH_INTEROP_THREADS or 1)
+    except RuntimeError as e:
+        # Only allowed before the first parallel op has run.
+        print(f"Could not set inter-op threads: {e}")
+
+def enable_compile_cache():
+    cache_dir = os.path.join(ensure_temp_dir(), "torch_compile_cache")
+    os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR", cache_dir)
+    try:
+        import torch._inductor.config as inductor_config
+        inductor_config.fx_graph_cache = True
+    except (ImportError, AttributeError):
+        pass
+
+def profile_model_name(profile="default"):
+    return SD_MODEL if profile == "default" else f"{SD_MODEL}@{profile}"
+
+def load_profile_pipeline(profile):
+    """
+    A pipeline of its own for the profile. Nothing is shared with the default pipeline, so
+    the default stays untouched and the registry frees each one independently.
+    """
+    settings = PERFORMANCE_PROFILES[profile]
+    pipe = load_pipeline()
+    if settings.get("scheduler") == "dpm++":
+        pipe.scheduler = DPMSolverMultistepScheduler.from_config(
+            pipe.scheduler.config, algorithm_type="dpmsolver++", solver_order=2)
+    if settings.get("channels_last"):
+        pipe.unet.to(memory_format=torch.channels_last)
+    if settings.get("compile"):
+        enable_compile_cache()
+        pipe.unet = torch.compile(pipe.unet)
+        pipe.vae.decode = torch.compile(pipe.vae.decode)
+    return pipe
+
+registry.register(SD_MODEL, load_pipeline)
+for _profile in PERFORMANCE_PROFILES:
+    if _profile != "default":
+        registry.register(profile_model_name(_profile), lambda profile=_profile: load_profile_pipeline(profile))
 
-def generate_aadhar_image(prompt, output_path=None, apply_blur_effect=False, blur_strength=2):
+def get_pipeline(profile="default"):
+    """The resident pipeline for the profile, loaded on first use and kept by the model registry."""
+    return registry.get(profile_model_name(profile))
+
+def pipeline_kwargs(profile="default"):
+    steps = PERFORMANCE_PROFILES[profile].get("steps")
+    return {"num_inference_steps": steps} if steps else {}
+
+@contextmanager
+def inference_context(profile="default"):
+    use_bf16 = PERFORMANCE_PROFILES[profile].get("bf16") and cpu_supports_bf16()
+    with torch.no_grad(), (torch.autocast("cpu", dtype=torch.bfloat16) if use_bf16 else nullcontext()):
+        yield
+
+def build_ai_prompt(name=None, dob=None, aadhar_number=None, vid=None):
+    """Prompt for one card from the details extract_details_from_prompt returns."""
+    ai_prompt = f"Aadhar card for {name or 'Random User'}"
+    if dob:
+        ai_prompt += f", born on {dob}"
+    if aadhar_number:
+        ai_prompt += f", Aadhar number {aadhar_number}"
+    if vid:
+        ai_prompt += f", VID {vid}"
+    return ai_prompt
+
+def enhance_prompt(prompt):
+    return f"An official Indian Aadhar card, government ID document, with details, {prompt}, highly detailed, realistic"
+
+def blur_image(image, blur_strength):
+    return image.filter(ImageFilter.GaussianBlur(radius=blur_strength))
+
+def generate_aadhar_image(prompt, output_path=None, apply_blur_effect=False, blur_strength=2, profile="default"):
     try:
         temp_dir = ensure_temp_dir()
         if output_path is None:
@@ -20,21 +152,23 @@ def generate_aadhar_image(prompt, output_path=None, apply_blur_effect=False, blu
         elif not os.path.isabs(output_path):
             output_path = os.path.join(temp_dir, output_path)
         
-        enhanced_prompt = f"An official Indian Aadhar card, government ID document, with details, {prompt}, highly detailed, realistic"
+        enhanced_prompt = enhance_prompt(prompt)
         
         device = "cpu"
         print(f"Using device: {device}")
         
-        pipe = download_model()
-        pipe = pipe.to(device)
+        # Built once and kept resident by the model registry.
+        pipe = get_pipeline(profile)
         
-        print(f"Generating image with prompt: {enhanced_prompt}")
-        with torch.no_grad():
-            image = pipe(enhanced_prompt).images[0]
+        print(f"Generating image with prompt: {enhanced_prompt} (profile: {profile})")
+        # Encoded outside autocast so one cached embedding serves every profile.
+        embeds = sd_prompt_embeds(pipe, SD_MODEL, [enhanced_prompt])
+        with inference_context(profile):
+            image = pipe(**embeds, **pipeline_kwargs(profile)).images[0]
         
         if apply_blur_effect:
             print(f"Applying blur effect with strength {blur_strength}")
-            image = image.filter(Image.FILTER.GaussianBlur(radius=blur_strength))
+            image = blur_image(image, blur_strength)
         
         image.save(output_path)
         print(f"AI-generated image saved as: {output_path}")
@@ -57,8 +191,97 @@ def generate_aadhar_image(prompt, output_path=None, apply_blur_effect=False, blu
             fallback_image = Image.open(fallback_path)
             
             if apply_blur_effect:
-                fallback_image = fallback_image.filter(Image.FILTER.GaussianBlur(radius=blur_strength))
+                fallback_image = blur_image(fallback_image, blur_strength)
                 
             fallback_image.save(output_path)
             return output_path
         return None
+
+def iter_aadhar_batches(details, output_dir=None, batch_size=4, num_images_per_prompt=1, apply_blur_effect=False,
+                        blur_strength=2, seed=None, profile="default", **pipe_kwargs):
+    """
+    Generates cards for a list of (name, dob, aadhar_number, vid) tuples.
+    Prompts are grouped into micro-batches of batch_size and each batch is a single pipeline
+    call, so the fixed per-step UNet overhead is shared by batch_size * num_images_per_prompt
+    images. Images are saved as soon as their batch finishes; yields that batch's paths.
+    """
+    output_dir = output_dir or os.path.join(ensure_temp_dir(), "ai_batch")
+    os.makedirs(output_dir, exist_ok=True)
+    pipe = get_pipeline(profile)
+    pipe_kwargs = dict(pipeline_kwargs(profile), **pipe_kwargs)
+
+    for start in range(0, len(details), batch_size):
+        batch = details[start:start + batch_size]
+        prompts = [enhance_prompt(build_ai_prompt(*card)) for card in batch]
+        generator = torch.Generator().manual_seed(seed + start) if seed is not None else None
+        print(f"Generating cards {start + 1}-{start + len(batch)} of {len(details)}")
+        embeds = sd_prompt_embeds(pipe, SD_MODEL, prompts)
+        with inference_context(profile):
+            images = pipe(**embeds, num_images_per_prompt=num_images_per_prompt, generator=generator,
+                          **pipe_kwargs).images
+
+        # diffusers returns the images of each prompt consecutively.
+        paths = []
+        for i, image in enumerate(images):
+            card_index, variant = start + i // num_images_per_prompt, i % num_images_per_prompt
+            if apply_blur_effect:
+                image = blur_image(image, blur_strength)
+            path = os.path.join(output_dir, f"ai_aadhar_{card_index + 1:05d}_{variant}.jpg")
+            image.save(path)
+            paths.append(path)
+        yield paths
+
+def generate_aadhar_batch(details, output_dir=None, batch_size=4, num_images_per_prompt=1, apply_blur_effect=False,
+                          blur_strength=2, seed=None, profile="default", **pipe_kwargs):
+    paths = []
+    for batch_paths in iter_aadhar_batches(details, output_dir, batch_size, num_images_per_prompt,
+                                           apply_blur_effect, blur_strength, seed, profile, **pipe_kwargs):
+        paths.extend(batch_paths)
+    return paths
+
+def benchmark_path():
+    return os.path.join(ensure_temp_dir(), "ai_profiles.json")
+
+def benchmark_profiles(prompt="Aadhar card for Random User", profiles=None, seed=0):
+    """
+    Generates the same prompt and seed with every profile after one warm-up call (which also
+    triggers torch.compile). Records latency and PSNR against the default profile's image.
+    """
+    profiles = profiles or list(PERFORMANCE_PROFILES)
+    profiles = ["default"] + [name for name in profiles if name != "default"]
+    results = {}
+    reference = None
+    for name in profiles:
+        pipe = get_pipeline(name)
+        kwargs = pipeline_kwargs(name)
+        with inference_context(name):
+            pipe(enhance_prompt(prompt), **dict(kwargs, num_inference_steps=2))
+            start = time.perf_counter()
+            image = pipe(enhance_prompt(prompt), generator=torch.Generator().manual_seed(seed), **kwargs).images[0]
+            seconds = time.perf_counter() - start
+        pixels = np.asarray(image, dtype=np.float32)
+        if reference is None:
+            reference = pixels
+        mse = float(np.mean((pixels - reference) ** 2))
+        psnr = float("inf") if mse == 0 else 10 * np.log10(255.0 ** 2 / mse)
+        path = os.path.join(ensure_temp_dir(), f"ai_profile_{name}.png")
+        image.save(path)
+        results[name] = {"seconds": round(seconds, 2), "psnr_vs_default": round(psnr, 2), "image": path,
+                         "bf16": bool(PERFORMANCE_PROFILES[name].get("bf16") and cpu_supports_bf16())}
+        print(f"{name:>18}: {seconds:.2f}s  PSNR vs default {results[name]['psnr_vs_default']} dB")
+    with open(benchmark_path(), "w") as f:
+        json.dump({"prompt": prompt, "seed": seed, "threads": torch.get_num_threads(), "profiles": results}, f, indent=2)
+    return results
+
+def profile_summary():
+    """Latency and quality of each profile from the last benchmark_profiles() run on this host."""
+    try:
+        with open(benchmark_path()) as f:
+            results = json.load(f)["profiles"]
+    except (OSError, ValueError, KeyError):
+        return "Run `python src/aiprocessor.py` to measure latency and quality per profile."
+    return "; ".join(f"{name}: {r['seconds']}s, {r['psnr_vs_default']} dB PSNR vs default"
+                     for name, r in results.items())
+
+if __name__ == "__main__":
+    benchmark_profiles()
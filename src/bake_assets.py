@@ -0,0 +1,105 @@
+# Run with: blender --background --python src/bake_assets.py -- [--force]
+#
+# Turns the occluder FBX models and their textures into one linkable .blend library,
+# and saves the base occlusion scene (surface, card, camera, light) next to it.
+# Each occluder is also rendered top-down into an RGBA layer plus shadow pass, which the
+# placement solver and the Blender-free 2.5D renderer use instead of guessing its shape.
+# occlude_render.py opens these instead of rebuilding the scene and importing FBX per render.
+
+import bpy
+import sys
+import os
+import argparse
+import json
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from occlude_render import build_scene, import_occluder, render_sprite
+from occlusionclient import (BAKED_DIR, DEFAULT_LIGHT_ENERGY, OBJECT_TYPES, SCALE_RANGES, TOP_DOWN_PPU,
+                             default_assets)
+from layoutcache import file_hash
+
+# Bump when the baking steps change so existing bakes are rebuilt.
+ASSET_VERSION = 2
+
+def parse_args():
+    argv = sys.argv
+    argv = argv[argv.index("--") + 1:] if "--" in argv else []
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--output_dir", default=BAKED_DIR)
+    parser.add_argument("--force", action="store_true", help="Rebake even if the sources are unchanged")
+    # Same sources the app renders with when nothing is baked.
+    for name, path in default_assets().items():
+        parser.add_argument(f"--{name}", default=path)
+    return parser.parse_args(argv)
+
+def source_manifest(args):
+    sources = {}
+    for object_type in OBJECT_TYPES:
+        for kind in ("model", "texture"):
+            path = getattr(args, f"{object_type}_{kind}")
+            sources[f"{object_type}_{kind}"] = {"path": os.path.abspath(path), "sha256": file_hash(path)}
+    return {"version": ASSET_VERSION, "sources": sources}
+
+def bake_library(args, library_path):
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    for object_type in OBJECT_TYPES:
+        obj = import_occluder(object_type,
+                              getattr(args, f"{object_type}_model"),
+                              getattr(args, f"{object_type}_texture"))
+        if obj is None:
+            raise RuntimeError(f"No mesh found in {object_type} model.")
+        # Renders link the mesh by this name and wrap it in a local object they can move.
+        obj.data.name = object_type.capitalize()
+        obj.data.use_fake_user = True
+    bpy.ops.file.pack_all()
+    bpy.ops.wm.save_as_mainfile(filepath=library_path)
+    print(f"Saved occluder library: {library_path}")
+
+def bake_base_scene(scene_path):
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    # Placeholder card; every render swaps in the real card image.
+    build_scene(bpy.data.images.new("CardPlaceholder", 8, 8))
+    bpy.ops.wm.save_as_mainfile(filepath=scene_path)
+    print(f"Saved base scene: {scene_path}")
+
+def bake_top_down_layers(args, output_dir, scene_path, library_path):
+    layers = {}
+    for object_type in OBJECT_TYPES:
+        sprite_name, shadow_name = f"top_{object_type}.png", f"top_{object_type}_shadow.png"
+        scale = SCALE_RANGES[object_type][1]
+        # Rendered at the largest scale so the layer is only ever downsampled.
+        render_sprite(argparse.Namespace(**dict(
+            vars(args), object_type=object_type, rotation=0, scale=scale, light_energy=DEFAULT_LIGHT_ENERGY,
+            sprite_ppu=TOP_DOWN_PPU, sprite_path=os.path.join(output_dir, sprite_name),
+            shadow_path=os.path.join(output_dir, shadow_name), profile="balanced", device="CPU", threads=0,
+            base_scene=scene_path, asset_library=library_path)))
+        layers[object_type] = {"sprite_path": sprite_name, "shadow_path": shadow_name, "ppu": TOP_DOWN_PPU,
+                               "scale": scale, "rotation": 0}
+    return layers
+
+def main():
+    args = parse_args()
+    os.makedirs(args.output_dir, exist_ok=True)
+    library_path = os.path.join(args.output_dir, "occluders.blend")
+    scene_path = os.path.join(args.output_dir, "base_scene.blend")
+    manifest_path = os.path.join(args.output_dir, "manifest.json")
+    layers_path = os.path.join(args.output_dir, "layers.json")
+
+    manifest = source_manifest(args)
+    baked = all(os.path.exists(path) for path in (library_path, scene_path, manifest_path, layers_path))
+    if not args.force and baked:
+        with open(manifest_path) as f:
+            if json.load(f) == manifest:
+                print("Baked assets are up to date.")
+                return
+
+    bake_library(args, library_path)
+    bake_base_scene(scene_path)
+    layers = bake_top_down_layers(args, args.output_dir, scene_path, library_path)
+    with open(layers_path, "w") as f:
+        json.dump({"version": ASSET_VERSION, "layers": layers}, f, indent=2)
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import argparse
+import csv
+import multiprocessing as mp
+import os
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from compositor import CardCompositor
+from fonts import get_font
+from layoutcache import get_template_layout
+from sidecar import write_sidecar
+
+# (sidecar field, layout key, csv column, adjust_y)
+ROW_FIELDS = [
+    ("name", "name", "name", -2),
+    ("dob", "dob", "dob", -2),
+    ("aadhar_number", "uid", "aadhar number", 0),
+    ("vid", "vid", "vid", -2),
+]
+
+# Per-process state, filled in by _init_worker.
+_worker = {}
+
+def _init_worker(shm_name, shape, dtype, layout, font_path):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    template = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    template.flags.writeable = False
+    _worker.update(
+        shm=shm,
+        layout=layout,
+        font_path=font_path,
+        # One output buffer per worker; between rows only the regions we drew
+        # into are restored from the shared template.
+        compositor=CardCompositor(template),
+    )
+
+def render_row(row, output_path):
+    compositor = _worker["compositor"]
+    layout = _worker["layout"]
+    canvas = compositor.begin()
+
+    fields = {}
+    for field, layout_key, column, adjust_y in ROW_FIELDS:
+        coords = layout.get(layout_key)
+        new_text = row.get(column)
+        if not coords or not new_text:
+            continue
+        # Fixed size of box height + 2, as generatenewimage has always drawn it.
+        font = get_font(_worker["font_path"], coords[3] - coords[1] + 2)
+        bottom = font.getbbox(new_text)[3]
+        y_aligned = coords[1] + (coords[3] - coords[1] - bottom) // 2 + adjust_y
+        fields[field] = compositor.draw_field(coords, new_text, font, (coords[0], y_aligned))
+
+    compositor.write(output_path)
+    write_sidecar(output_path, fields, canvas.shape[1], canvas.shape[0])
+    return output_path
+
+def _render_chunk(chunk):
+    return [render_row(row, output_path) for row, output_path in chunk]
+
+def output_name(index, row):
+    return f"output_{index + 1}_{row['name'].replace(' ', '_')}.jpg"
+
+def read_rows(csv_path):
+    with open(csv_path, newline='', encoding='utf-8-sig', errors='replace') as csvfile:
+        return list(csv.DictReader(csvfile))
+
+def generate_batch(template_path, csv_path, output_dir, font_path="arial.ttf", workers=None, chunk_size=32):
+    """
+    Renders one card per CSV row with a process pool. The decoded template lives once
+    in shared memory; workers map it read-only and only copy the field regions they change.
+    """
+    if not os.path.exists(template_path):
+        raise FileNotFoundError(f"Template not found: {template_path}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    template = cv2.imread(template_path)
+    layout = get_template_layout(template_path, cv2.cvtColor(template, cv2.COLOR_BGR2RGB))
+
+    rows = read_rows(csv_path)
+    jobs = [(row, os.path.join(output_dir, output_name(i, row))) for i, row in enumerate(rows)]
+    chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+    workers = workers or os.cpu_count() or 1
+
+    shm = shared_memory.SharedMemory(create=True, size=template.nbytes)
+    shared = None
+    try:
+        shared = np.ndarray(template.shape, dtype=template.dtype, buffer=shm.buf)
+        shared[:] = template
+        del template
+
+        start = time.time()
+        done = 0
+        outputs = []
+        init_args = (shm.name, shared.shape, shared.dtype.str, layout, font_path)
+        with mp.Pool(workers, initializer=_init_worker, initargs=init_args) as pool:
+            for paths in pool.imap(_render_chunk, chunks):
+                outputs.extend(paths)
+                done += len(paths)
+                rate = done / max(time.time() - start, 1e-6)
+                print(f"Generated {done}/{len(jobs)} cards ({rate:.1f} cards/s)")
+    finally:
+        # Views into the buffer must be dropped before the segment can be closed.
+        shared = None
+        shm.close()
+        shm.unlink()
+    return outputs
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate Aadhaar cards for every row of a CSV.")
+    parser.add_argument("--template", default="template.png")
+    parser.add_argument("--csv", required=True)
+    parser.add_argument("--output_dir", default="generated_output")
+    parser.add_argument("--font", default="arial.ttf")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk_size", type=int, default=32)
+    args = parser.parse_args()
+    generate_batch(args.template, args.csv, args.output_dir, args.font, args.workers, args.chunk_size)
@@ -0,0 +1,105 @@
+import atexit
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+from occlusionclient import BlenderRenderServer
+
+# Defaults can be overridden per machine, e.g. HYPERGEN_BLENDER_WORKERS=16 on a 64-core box.
+DEFAULT_WORKERS = int(os.environ.get("HYPERGEN_BLENDER_WORKERS", "0")) or max(1, (os.cpu_count() or 1) // 8)
+DEFAULT_MEMORY_MB = int(os.environ.get("HYPERGEN_BLENDER_MEMORY_MB", "0")) or None
+
+class BlenderWorkerPool:
+    """
+    N persistent Blender render servers, each pinned to its own slice of the cores with
+    a matching --threads count so workers never oversubscribe the CPU. Jobs go through
+    one queue; a worker whose Blender crashes is restarted and the job retried once.
+    """
+
+    def __init__(self, blender_executable, occlusion_script, workers=None, memory_mb=None, max_retries=1):
+        self.workers = workers or DEFAULT_WORKERS
+        self.memory_mb = memory_mb if memory_mb is not None else DEFAULT_MEMORY_MB
+        self.max_retries = max_retries
+        self.jobs = queue.Queue()
+        self.servers = []
+        self.threads = []
+
+        cores = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+        share = max(1, len(cores) // self.workers)
+        for i in range(self.workers):
+            worker_cores = cores[i * share:(i + 1) * share] or cores
+            # Each Blender pins itself to its cores and caps its own memory (see occlude_render.limit_resources).
+            script_args = ["--threads", str(share), "--cpu_cores", ",".join(map(str, worker_cores))]
+            if self.memory_mb:
+                script_args += ["--memory_mb", str(self.memory_mb)]
+            server = BlenderRenderServer(
+                blender_executable,
+                occlusion_script,
+                blender_args=["--threads", str(share)],
+                script_args=script_args,
+            )
+            self.servers.append(server)
+            thread = threading.Thread(target=self._run, args=(server,), daemon=True, name=f"blender-worker-{i}")
+            thread.start()
+            self.threads.append(thread)
+
+    def _run(self, server):
+        while True:
+            item = self.jobs.get()
+            if item is None:
+                break
+            job, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            for attempt in range(self.max_retries + 1):
+                try:
+                    future.set_result(server.render(job))
+                    break
+                except Exception as e:
+                    # A dead process means Blender crashed (or hit its memory cap); the next
+                    # render() starts a fresh one. A job that failed inside a live Blender is not retried.
+                    if server.alive() or attempt == self.max_retries:
+                        future.set_exception(e)
+                        break
+                    print(f"Blender worker crashed ({e}); restarting and retrying the job.")
+
+    def submit(self, job):
+        future = Future()
+        self.jobs.put((job, future))
+        return future
+
+    def render(self, job):
+        return self.submit(job).result()
+
+    def map(self, jobs):
+        """Renders jobs in parallel and yields their responses in submission order."""
+        futures = [self.submit(job) for job in jobs]
+        for future in futures:
+            yield future.result()
+
+    def close(self):
+        for _ in self.threads:
+            self.jobs.put(None)
+        for thread in self.threads:
+            thread.join()
+        for server in self.servers:
+            server.close()
+        self.threads = []
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_blender_pool(blender_executable, occlusion_script, workers=None):
+    key = (blender_executable, occlusion_script)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = BlenderWorkerPool(blender_executable, occlusion_script, workers=workers)
+            _pools[key] = pool
+    return pool
+
+@atexit.register
+def _shutdown_pools():
+    for pool in list(_pools.values()):
+        pool.close()
@@ -0,0 +1,81 @@
+import bpy
+import numpy as np
+
+class BlurCompositor:
+    """
+    Long-lived Blender compositor for Gaussian blur.
+    The node graph lives in its own scene and is built once; each call only swaps the
+    pixels of the input image datablock and reads the Viewer Node back in memory,
+    so there are no temp files and no node tree rebuilds.
+    """
+
+    SCENE_NAME = "HypergenBlur"
+    IMAGE_NAME = "HypergenBlurInput"
+
+    def __init__(self):
+        scene = bpy.data.scenes.get(self.SCENE_NAME) or bpy.data.scenes.new(self.SCENE_NAME)
+        scene.use_nodes = True
+        scene.render.use_compositing = True
+        scene.render.use_sequencer = False
+        scene.render.resolution_percentage = 100
+        # Values go in and come out untouched apart from the blur itself.
+        scene.view_settings.view_transform = 'Standard'
+        self.scene = scene
+
+        image = bpy.data.images.get(self.IMAGE_NAME)
+        if image is None:
+            image = bpy.data.images.new(self.IMAGE_NAME, 1, 1, alpha=True, float_buffer=True)
+        image.colorspace_settings.name = 'Non-Color'
+        self.image = image
+
+        tree = scene.node_tree
+        tree.nodes.clear()
+        image_node = tree.nodes.new('CompositorNodeImage')
+        image_node.image = image
+        self.blur_node = tree.nodes.new('CompositorNodeBlur')
+        self.blur_node.filter_type = 'GAUSS'
+        self.blur_node.use_relative = False
+        composite_node = tree.nodes.new('CompositorNodeComposite')
+        viewer_node = tree.nodes.new('CompositorNodeViewer')
+
+        links = tree.links
+        links.new(image_node.outputs['Image'], self.blur_node.inputs['Image'])
+        links.new(self.blur_node.outputs['Image'], composite_node.inputs['Image'])
+        links.new(self.blur_node.outputs['Image'], viewer_node.inputs['Image'])
+
+    def _load(self, image_array):
+        height, width = image_array.shape[:2]
+        if tuple(self.image.size) != (width, height):
+            self.image.scale(width, height)
+            self.scene.render.resolution_x = width
+            self.scene.render.resolution_y = height
+
+        rgba = np.ones((height, width, 4), dtype=np.float32)
+        rgba[..., :3] = image_array[..., :3].astype(np.float32) / 255.0
+        # Blender stores pixels bottom row first.
+        self.image.pixels.foreach_set(np.ascontiguousarray(rgba[::-1]).ravel())
+        self.image.update()
+
+    def _read(self, height, width):
+        viewer = bpy.data.images['Viewer Node']
+        buffer = np.empty(width * height * 4, dtype=np.float32)
+        viewer.pixels.foreach_get(buffer)
+        rgba = buffer.reshape(height, width, 4)[::-1]
+        return (np.clip(rgba[..., :3], 0.0, 1.0) * 255.0 + 0.5).astype(np.uint8)
+
+    def blur(self, image_array, blur_strength=10):
+        """Blurs an HxWx3 uint8 array; channel order is preserved."""
+        self.blur_node.size_x = blur_strength
+        self.blur_node.size_y = blur_strength
+        self._load(image_array)
+        # Only the compositor runs: there is no Render Layers node, so nothing is path traced.
+        bpy.ops.render.render(scene=self.scene.name, use_viewport=False, write_still=False)
+        return self._read(*image_array.shape[:2])
+
+_compositor = None
+
+def get_blur_compositor():
+    global _compositor
+    if _compositor is None:
+        _compositor = BlurCompositor()
+    return _compositor
@@ -0,0 +1,92 @@
+import os
+import threading
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw
+
+from glyphatlas import draw_glyphs
+
+class CardCompositor:
+    """
+    Holds a read-only base template and one preallocated output buffer.
+    Fields are drawn into small regions of the buffer; begin() only restores the
+    regions touched by the previous card, so no full-frame copy happens per card.
+    Arrays are BGR, matching cv2.imread/imwrite.
+    """
+
+    def __init__(self, base):
+        self.base = base
+        self.canvas = base.copy()
+        self.dirty = []
+        self.lock = threading.Lock()
+
+    def begin(self):
+        for x0, y0, x1, y1 in self.dirty:
+            self.canvas[y0:y1, x0:x1] = self.base[y0:y1, x0:x1]
+        self.dirty = []
+        return self.canvas
+
+    def draw_field(self, coords, new_text, font, origin, fill=(0, 0, 0), background=(255, 255, 255)):
+        """
+        Clears the field box and draws new_text at origin (PIL text anchor).
+        Digit-only text goes through the glyph atlas; everything else is drawn with
+        PIL into a buffer the size of the field. Returns the sidecar label.
+        """
+        canvas = self.canvas
+        x1, y1, x2, y2 = coords
+        left, top, right, bottom = font.getbbox(new_text)
+        tx, ty = origin
+
+        img_h, img_w = canvas.shape[:2]
+        canvas[y1:y2 + 1, x1:x2 + 1] = background
+        # The atlas rounds glyph positions its own way, so its dirty rect is what it reports
+        # having written rather than PIL's bbox of the string.
+        drawn = draw_glyphs(canvas, origin, new_text, font, fill=fill)
+        if drawn is None:
+            rx0, ry0 = max(0, min(x1, tx + left)), max(0, min(y1, ty + top))
+            rx1, ry1 = min(img_w, max(x2 + 1, tx + right)), min(img_h, max(y2 + 1, ty + bottom))
+            roi = Image.fromarray(canvas[ry0:ry1, rx0:rx1])
+            ImageDraw.Draw(roi).text((tx - rx0, ty - ry0), new_text, font=font, fill=fill)
+            canvas[ry0:ry1, rx0:rx1] = np.asarray(roi)
+        elif drawn[0] < drawn[2] and drawn[1] < drawn[3]:
+            rx0, ry0 = max(0, min(x1, drawn[0])), max(0, min(y1, drawn[1]))
+            rx1, ry1 = min(img_w, max(x2 + 1, drawn[2])), min(img_h, max(y2 + 1, drawn[3]))
+        else:
+            rx0, ry0, rx1, ry1 = max(0, x1), max(0, y1), min(img_w, x2 + 1), min(img_h, y2 + 1)
+        self.dirty.append((rx0, ry0, rx1, ry1))
+
+        return {
+            "bbox": [tx + left, ty + top, tx + right, ty + bottom],
+            "text": new_text,
+            "font_size": getattr(font, "size", None),
+        }
+
+    def write(self, output_path, image=None):
+        image = self.canvas if image is None else image
+        # imencode + a plain file write also copes with non-ASCII names on Windows.
+        ok, encoded = cv2.imencode(os.path.splitext(output_path)[1] or ".jpg", image)
+        if not ok:
+            raise RuntimeError(f"Failed to encode {output_path}")
+        with open(output_path, "wb") as f:
+            f.write(encoded.tobytes())
+        return output_path
+
+_compositors = {}
+_compositors_lock = threading.Lock()
+
+def get_compositor(template_path):
+    """One compositor per template file, reloaded when the file changes on disk."""
+    stat = os.stat(template_path)
+    key = os.path.abspath(template_path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _compositors_lock:
+        entry = _compositors.get(key)
+        if entry is None or entry[0] != version:
+            base = cv2.imread(template_path)
+            if base is None:
+                raise FileNotFoundError(f"Template image not found at {template_path}")
+            base.flags.writeable = False
+            entry = (version, CardCompositor(base))
+            _compositors[key] = entry
+    return entry[1]
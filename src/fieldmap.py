@@ -0,0 +1,138 @@
+import re
+from collections import namedtuple
+
+from ocrcache import cached_readtext, load_pixels
+
+FIELDS = ("name", "dob", "aadhar_number", "vid", "gender")
+
+AADHAR_PATTERN = r'\d{4}\s*\d{4}\s*\d{4}'
+DOB_PATTERN = r'\d{1,2}[-/.]\d{1,2}[-/.]\d{2,4}'
+GENDER_PATTERN = r'\b(female|male|transgender)\b'
+
+# bbox is always [x1, y1, x2, y2] in image pixels.
+FieldResult = namedtuple("FieldResult", ["bbox", "text", "confidence"])
+
+class FieldMap(dict):
+    """Field name -> FieldResult for every field found in a single OCR pass."""
+
+    def __init__(self, width, height, source="ocr"):
+        super().__init__()
+        self.width = width
+        self.height = height
+        self.source = source
+
+    def bbox(self, field):
+        result = self.get(field)
+        return result.bbox if result else None
+
+    def text(self, field):
+        result = self.get(field)
+        return result.text if result else None
+
+def quad_to_rect(bbox):
+    x_coords = [pt[0] for pt in bbox]
+    y_coords = [pt[1] for pt in bbox]
+    return [min(x_coords), min(y_coords), max(x_coords), max(y_coords)]
+
+def _digits(text):
+    return re.sub(r'\D', '', text)
+
+def match_name(results, image_height):
+    for result in results:
+        bbox, text, prob = result
+        y_top = bbox[0][1]
+
+        is_proper_name = (
+            text.replace(" ", "").isalpha() and
+            len(text.split()) >= 1 and
+            prob > 0.5 and
+            y_top < image_height * 0.7 and
+            "government of india" not in text.lower() and
+            len(text) > 3
+        )
+        if is_proper_name:
+            return result
+
+    results_sorted = sorted(results, key=lambda x: x[0][0][1])
+    for result in results_sorted[:5]:
+        bbox, text, prob = result
+        if len(text) > 3 and prob > 0.4:
+            return result
+    return None
+
+def match_aadhar_number(results):
+    for result in results:
+        text = result[1]
+        if re.findall(AADHAR_PATTERN, text) or (len(text.replace(" ", "")) >= 10 and text.replace(" ", "").isdigit()):
+            return result
+    return None
+
+def match_vid(results):
+    for result in results:
+        if len(_digits(result[1])) == 16:
+            return result
+    return None
+
+def match_dob(results):
+    for result in results:
+        if re.search(DOB_PATTERN, result[1]):
+            return result
+    return None
+
+def match_gender(results):
+    for result in results:
+        if re.search(GENDER_PATTERN, result[1], re.IGNORECASE):
+            return result
+    return None
+
+def detect_name_field(results, image_height):
+    """Detect name field in OCR results"""
+    result = match_name(results, image_height)
+    if result is None:
+        return None, None
+    print(f"Name Field Detected: {result[1]}")
+    return result[0], result[1]
+
+def detect_aadhar_number(results):
+    result = match_aadhar_number(results)
+    if result is None:
+        return None, None
+    print(f"Aadhaar Number detected: {result[1]}")
+    return result[0], result[1]
+
+def fields_from_results(results, width, height):
+    fields = FieldMap(width, height)
+
+    vid = match_vid(results)
+    # A 16-digit VID also matches the Aadhaar pattern, so keep it out of that search.
+    remaining = [r for r in results if r is not vid]
+    matches = {
+        "name": match_name(results, height),
+        "dob": match_dob(results),
+        "aadhar_number": match_aadhar_number(remaining),
+        "vid": vid,
+        "gender": match_gender(results),
+    }
+    for field, result in matches.items():
+        if result is not None:
+            bbox, text, prob = result
+            fields[field] = FieldResult(quad_to_rect(bbox), text, float(prob))
+    return fields
+
+def extract_fields(image, results=None):
+    """
+    Runs OCR once (through the result cache) and returns a FieldMap with
+    name, dob, aadhar_number, vid and gender. Images with a generation sidecar
+    skip OCR entirely.
+    """
+    if results is None and isinstance(image, str):
+        from sidecar import read_sidecar
+        fields = read_sidecar(image)
+        if fields is not None:
+            return fields
+
+    pixels = load_pixels(image)
+    height, width = pixels.shape[:2]
+    if results is None:
+        results = cached_readtext(image, ['en'], gpu=False)
+    return fields_from_results(results, width, height)
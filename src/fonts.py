@@ -0,0 +1,81 @@
+import os
+import sys
+from functools import lru_cache
+
+from PIL import ImageFont
+
+FONT_EXTENSIONS = (".ttf", ".otf", ".ttc")
+
+# Metric-compatible stand-ins for Arial on machines that don't ship it.
+FALLBACKS = {
+    "arial.ttf": ["Arial.ttf", "LiberationSans-Regular.ttf", "DejaVuSans.ttf", "FreeSans.ttf"],
+}
+
+def system_font_dirs():
+    if sys.platform.startswith("win"):
+        windir = os.environ.get("WINDIR", "C:/Windows")
+        dirs = [os.path.join(windir, "Fonts")]
+        local = os.environ.get("LOCALAPPDATA")
+        if local:
+            dirs.append(os.path.join(local, "Microsoft", "Windows", "Fonts"))
+        return dirs
+    if sys.platform == "darwin":
+        return ["/System/Library/Fonts", "/Library/Fonts", os.path.expanduser("~/Library/Fonts")]
+    return ["/usr/share/fonts", "/usr/local/share/fonts",
+            os.path.expanduser("~/.local/share/fonts"), os.path.expanduser("~/.fonts")]
+
+@lru_cache(maxsize=1)
+def font_index():
+    """Scans the system font directories once; lower-cased file name -> path."""
+    index = {}
+    for font_dir in system_font_dirs():
+        for root, _, files in os.walk(font_dir):
+            for name in files:
+                if name.lower().endswith(FONT_EXTENSIONS):
+                    index.setdefault(name.lower(), os.path.join(root, name))
+    return index
+
+@lru_cache(maxsize=64)
+def resolve_font(font_path):
+    """Maps a font path or bare file name like 'arial.ttf' to a real file, or None."""
+    if os.path.isfile(font_path):
+        return font_path
+    index = font_index()
+    name = os.path.basename(font_path)
+    for candidate in [name] + FALLBACKS.get(name.lower(), []):
+        path = index.get(candidate.lower())
+        if path:
+            return path
+    print(f"Font not found: {font_path}, using PIL default font")
+    return None
+
+@lru_cache(maxsize=256)
+def _truetype(path, size):
+    return ImageFont.truetype(path, size)
+
+def get_font(font_path, size):
+    """Cached FreeType font for (path, size); falls back to PIL's default font."""
+    path = resolve_font(font_path)
+    if path is None:
+        return ImageFont.load_default()
+    return _truetype(path, max(1, int(size)))
+
+def fit_font(text, target_width, target_height, font_path="arial.ttf"):
+    """Largest font size whose rendered text fits inside target_width x target_height."""
+    path = resolve_font(font_path)
+    if path is None:
+        return get_font(font_path, target_height)
+
+    def fits(size):
+        _, _, right, bottom = _truetype(path, size).getbbox(text)
+        return right <= target_width and bottom <= target_height
+
+    # Text extents grow monotonically with size, so binary search the largest fit.
+    low, high = 1, max(1, int(target_height))
+    while low < high:
+        mid = (low + high + 1) // 2
+        if fits(mid):
+            low = mid
+        else:
+            high = mid - 1
+    return _truetype(path, low)
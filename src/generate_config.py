@@ -1,14 +1,17 @@
 import cv2
-import easyocr
 import json
 import os
-from partialgenprocessor import detect_name_field, detect_aadhar_number, expand_bbox
+from fieldmap import extract_fields
+from partialgenprocessor import expand_bbox
+from occlusion_jobs import make_spec, write_specs
 
 def generate_config(
     image_path,
     selected_field="name",     # 'name' or 'aadhar'
     object_type="coin",        # 'coin', 'pen', etc.
-    output_path="output/render.png"
+    output_path="output/render.png",
+    spec_path="occlusion_jobs.jsonl",
+    append=False
 ):
     # Load image
     image = cv2.imread(image_path)
@@ -17,38 +20,33 @@ def generate_config(
 
     h, w = image.shape[:2]
 
-    # Run OCR
-    reader = easyocr.Reader(['en'], gpu=False)
-    results = reader.readtext(image)
+    # Run OCR (or read the card's sidecar)
+    fields = extract_fields(image_path)
 
     # Choose field to occlude
     if selected_field == "name":
-        bbox, text = detect_name_field(results, h)
+        field = "name"
     elif selected_field == "aadhar":
-        bbox, text = detect_aadhar_number(results)
+        field = "aadhar_number"
     else:
         raise ValueError("Invalid field selected. Choose either 'name' or 'aadhar'.")
 
+    bbox = fields.bbox(field)
     if bbox is None:
         raise Exception(f"Could not detect the {selected_field} field.")
 
     # Expand the bounding box slightly
-    target_coords = expand_bbox(bbox, w, h, margin_ratio=0.05)
-
-    # Prepare config data
-    config = {
-        "img_path": os.path.abspath(image_path),
-        "object": object_type,
-        "target_coords": target_coords,
-        "render_path": os.path.abspath(output_path)
-    }
-
-    # Write to config.json
-    with open("config.json", "w") as f:
-        json.dump(config, f, indent=4)
-
-    print("config.json written successfully!")
-    print(json.dumps(config, indent=2))
+    boxes = {name: list(result.bbox) for name, result in fields.items()}
+    boxes[field] = expand_bbox(bbox, w, h, margin_ratio=0.05)
+
+    # One job spec, rendered by `occlusion_jobs.py run` or `occlude_render.py --jobs`
+    spec_id = f"{os.path.splitext(os.path.basename(image_path))[0]}-{field}-{object_type}"
+    spec = make_spec(spec_id, image_path, w, h, boxes, field, object_type, output_path)
+    write_specs([spec], spec_path, append=append)
+
+    print(f"{spec_path} written successfully!")
+    print(json.dumps(spec, indent=2))
+    return spec
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,120 @@
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+# Aadhaar numbers, VIDs and DOBs only ever use these characters.
+NUMERIC_CHARSET = "0123456789 /"
+
+class GlyphAtlas:
+    """
+    Pre-rasterized coverage masks for a fixed character set at one (font, size).
+    Glyphs are packed side by side into a single uint8 array; strings are composed
+    from those tiles using the font's advances and pair kerning.
+    """
+
+    def __init__(self, font, charset=NUMERIC_CHARSET):
+        self.charset = charset
+        self.glyphs = {}
+        self.advances = {ch: font.getlength(ch) for ch in charset}
+        self.kerning = {}
+        for a in charset:
+            for b in charset:
+                kern = font.getlength(a + b) - self.advances[a] - self.advances[b]
+                if kern:
+                    self.kerning[(a, b)] = kern
+
+        tiles = {}
+        atlas_x = 0
+        for ch in charset:
+            left, top, right, bottom = font.getbbox(ch)
+            w, h = right - left, bottom - top
+            if w <= 0 or h <= 0:
+                self.glyphs[ch] = None
+                continue
+            tile = Image.new("L", (w, h), 0)
+            ImageDraw.Draw(tile).text((-left, -top), ch, font=font, fill=255)
+            tiles[ch] = np.asarray(tile)
+            # (x offset into the atlas, width, height, bearing x, bearing y)
+            self.glyphs[ch] = (atlas_x, w, h, left, top)
+            atlas_x += w
+
+        atlas_h = max((t.shape[0] for t in tiles.values()), default=0)
+        self.atlas = np.zeros((atlas_h, atlas_x), dtype=np.uint8)
+        for ch, tile in tiles.items():
+            x, w, h, _, _ = self.glyphs[ch]
+            self.atlas[:h, x:x + w] = tile
+
+    def supports(self, text):
+        return all(ch in self.advances for ch in text)
+
+    def coverage(self, text):
+        """Returns (alpha mask as float32 in [0, 1], offset_x, offset_y) for the whole string."""
+        placements = []
+        pen = 0.0
+        prev = None
+        for ch in text:
+            if prev is not None:
+                pen += self.kerning.get((prev, ch), 0.0)
+            info = self.glyphs[ch]
+            if info is not None:
+                x, w, h, left, top = info
+                placements.append((x, w, h, int(round(pen)) + left, top))
+            pen += self.advances[ch]
+            prev = ch
+
+        if not placements:
+            return None, 0, 0
+        min_x = min(p[3] for p in placements)
+        min_y = min(p[4] for p in placements)
+        max_x = max(p[3] + p[1] for p in placements)
+        max_y = max(p[4] + p[2] for p in placements)
+
+        mask = np.zeros((max_y - min_y, max_x - min_x), dtype=np.uint8)
+        for x, w, h, dx, dy in placements:
+            region = mask[dy - min_y:dy - min_y + h, dx - min_x:dx - min_x + w]
+            np.maximum(region, self.atlas[:h, x:x + w], out=region)
+        return mask.astype(np.float32) / 255.0, min_x, min_y
+
+@lru_cache(maxsize=32)
+def _atlas_for(font_path, size, charset):
+    from fonts import get_font
+    return GlyphAtlas(get_font(font_path, size), charset)
+
+def get_atlas(font, charset=NUMERIC_CHARSET):
+    """Atlas for a FreeType font file, built once per (path, size); None for other fonts."""
+    path = getattr(font, "path", None)
+    size = getattr(font, "size", None)
+    # Pillow >= 10.1's load_default() is a FreeType font backed by a BytesIO, which can't be
+    # reopened by path; those fall back to PIL drawing like bitmap fonts.
+    if not isinstance(path, str) or size is None:
+        return None
+    return _atlas_for(path, size, charset)
+
+def draw_glyphs(canvas, xy, text, font, fill=(0, 0, 0), charset=NUMERIC_CHARSET):
+    """
+    Alpha-blits text into an HxWxC uint8 array in place, positioned like
+    ImageDraw.text(xy, text, font=font). Returns the (x0, y0, x1, y1) box of the pixels
+    it wrote (empty when nothing was drawn), or None if the atlas can't render the text.
+    """
+    atlas = get_atlas(font, charset)
+    if atlas is None or not atlas.supports(text):
+        return None
+    alpha, off_x, off_y = atlas.coverage(text)
+    x, y = int(xy[0]), int(xy[1])
+    if alpha is None:
+        return (x, y, x, y)
+
+    x0, y0 = x + off_x, y + off_y
+    h, w = alpha.shape
+    img_h, img_w = canvas.shape[:2]
+    cx0, cy0 = max(x0, 0), max(y0, 0)
+    cx1, cy1 = min(x0 + w, img_w), min(y0 + h, img_h)
+    if cx0 >= cx1 or cy0 >= cy1:
+        return (x, y, x, y)
+
+    a = alpha[cy0 - y0:cy1 - y0, cx0 - x0:cx1 - x0, None]
+    roi = canvas[cy0:cy1, cx0:cx1].astype(np.float32)
+    color = np.asarray(fill, dtype=np.float32)[:canvas.shape[2]]
+    canvas[cy0:cy1, cx0:cx1] = (roi + (color - roi) * a + 0.5).astype(np.uint8)
+    return (cx0, cy0, cx1, cy1)
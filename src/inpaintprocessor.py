@@ -1,11 +1,22 @@
 import torch
 import gradio as gr
 import os
-from PIL import Image
+import numpy as np
+from PIL import Image, ImageFilter
 from diffusers import FluxFillPipeline
+from promptcache import flux_prompt_embeds
 
+FLUX_MODEL = "black-forest-labs/FLUX.1-Fill-dev"
 pipe = None
 
+# ROI mode: only the mask's bounding box plus some context is inpainted, at a size the model
+# works well at, and the result is feathered back into the untouched full-resolution card.
+ROI_PADDING = 64
+ROI_MIN_SIDE = 512
+ROI_MAX_SIDE = 1024
+ROI_MAX_ASPECT = 4
+FEATHER_RADIUS = 8
+
 def ensure_temp_dir():
     temp_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp")
     if not os.path.exists(temp_dir):
@@ -15,7 +26,7 @@ def ensure_temp_dir():
 def load_model():
     global pipe
     if pipe is None:
-        pipe = FluxFillPipeline.from_pretrained("black-forest-labs/FLUX.1-Fill-dev",torch_dtype=torch.float16).to("cuda")
+        pipe = FluxFillPipeline.from_pretrained(FLUX_MODEL,torch_dtype=torch.float16).to("cuda")
         return "Model loaded successfully."
     else:
         return "Model is already loaded."
@@ -35,25 +46,84 @@ def calculate_optimal_dimensions(image):
 
     return width, height
 
-def inpaint_with_mask(img_data, prompt="", num_inference_steps=30, guidance_scale=80):
-    if pipe is None:
-        return "⚠️ Load the model first."
-    if img_data is None:
+def roi_box(mask, padding=ROI_PADDING):
+    """Bounding box of the mask grown by padding px of context, or None for an empty mask."""
+    ys, xs = np.nonzero(np.asarray(mask) > 127)
+    if not len(xs):
         return None
+    width, height = mask.size
+    x1, y1 = max(0, xs.min() - padding), max(0, ys.min() - padding)
+    x2, y2 = min(width, xs.max() + 1 + padding), min(height, ys.max() + 1 + padding)
+
+    # A single text line is a thin strip; widen the short side so the model sees some layout.
+    grow_x = max(0, -(-(y2 - y1) // ROI_MAX_ASPECT) - (x2 - x1))
+    grow_y = max(0, -(-(x2 - x1) // ROI_MAX_ASPECT) - (y2 - y1))
+    x1, x2 = max(0, x1 - grow_x // 2), min(width, x2 + grow_x - grow_x // 2)
+    y1, y2 = max(0, y1 - grow_y // 2), min(height, y2 + grow_y - grow_y // 2)
+    return int(x1), int(y1), int(x2), int(y2)
+
+def roi_dimensions(crop_width, crop_height):
+    """Crop size scaled so its longer side is within ROI_MIN_SIDE..ROI_MAX_SIDE, in multiples of 16."""
+    longest = max(crop_width, crop_height)
+    factor = min(max(longest, ROI_MIN_SIDE), ROI_MAX_SIDE) / longest
+    # Flux packs 2x2 latent patches over an 8x VAE, so sides must be multiples of 16.
+    width = max(16, int(round(crop_width * factor / 16)) * 16)
+    height = max(16, int(round(crop_height * factor / 16)) * 16)
+    return width, height
 
-    base_image = Image.fromarray(img_data["image"]).convert("RGB")
-    mask = Image.fromarray(img_data["mask"]).convert("L")
-    width, height = calculate_optimal_dimensions(base_image)
+def feather_mask(mask, radius=FEATHER_RADIUS):
+    """Mask grown and blurred by radius so the stitched crop has no visible seam."""
+    if radius <= 0:
+        return mask
+    return mask.filter(ImageFilter.MaxFilter(2 * (radius // 2) + 1)).filter(ImageFilter.GaussianBlur(radius / 2))
+
+def inpaint_roi(base_image, mask, prompt, num_inference_steps, guidance_scale, padding=ROI_PADDING):
+    """Inpaints only the padded mask box and blends it back into the full-resolution image."""
+    box = roi_box(mask, padding)
+    if box is None:
+        return base_image
+    crop, crop_mask = base_image.crop(box), mask.crop(box)
+    width, height = roi_dimensions(*crop.size)
+    print(f"Inpainting ROI {box} at {width}x{height}")
 
     result = pipe(
-        prompt=prompt,
+        **flux_prompt_embeds(pipe, FLUX_MODEL, prompt),
         height=height,
         width=width,
-        image=base_image,
-        mask_image=mask,
+        image=crop.resize((width, height), Image.LANCZOS),
+        mask_image=crop_mask.resize((width, height), Image.LANCZOS),
         num_inference_steps=num_inference_steps,
         guidance_scale=guidance_scale,
-    ).images[0]
+    ).images[0].resize(crop.size, Image.LANCZOS)
+
+    output = base_image.copy()
+    output.paste(Image.composite(result, crop, feather_mask(crop_mask)), box[:2])
+    return output
+
+def inpaint_with_mask(img_data, prompt="", num_inference_steps=30, guidance_scale=80, roi_mode=True,
+                      roi_padding=ROI_PADDING):
+    if pipe is None:
+        return "⚠️ Load the model first."
+    if img_data is None:
+        return None
+
+    base_image = Image.fromarray(img_data["image"]).convert("RGB")
+    mask = Image.fromarray(img_data["mask"]).convert("L")
+    num_inference_steps = int(num_inference_steps)
+
+    if roi_mode:
+        result = inpaint_roi(base_image, mask, prompt, num_inference_steps, guidance_scale, int(roi_padding))
+    else:
+        width, height = calculate_optimal_dimensions(base_image)
+        result = pipe(
+            **flux_prompt_embeds(pipe, FLUX_MODEL, prompt),
+            height=height,
+            width=width,
+            image=base_image,
+            mask_image=mask,
+            num_inference_steps=num_inference_steps,
+            guidance_scale=guidance_scale,
+        ).images[0]
 
     temp_dir = ensure_temp_dir()
     output_path = os.path.join(temp_dir, "inpainted_result.png")
@@ -83,8 +153,13 @@ def flux_inpaint_ui():
         prompt = gr.Textbox(label="Prompt", value="")
         steps = gr.Number(label="Inference Steps", value=30)
         scale = gr.Number(label="Guidance Scale", value=80)
+        with gr.Row():
+            roi_mode = gr.Checkbox(label="Inpaint masked region only (ROI)", value=True,
+                                   info="Crops the mask's box plus context instead of resampling the whole card")
+            roi_padding = gr.Slider(label="ROI Context Padding (px)", minimum=0, maximum=256, step=8, value=ROI_PADDING)
 
         inpaint_btn = gr.Button("Run Inpainting")
-        inpaint_btn.click(fn=inpaint_with_mask, inputs=[image_input, prompt, steps, scale], outputs=output_img)
+        inpaint_btn.click(fn=inpaint_with_mask, inputs=[image_input, prompt, steps, scale, roi_mode, roi_padding],
+                          outputs=output_img)
 
     return flux_tab
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import tempfile
+from functools import lru_cache
+
+# cv2 and the OCR cache are imported where they are used, so Blender scripts
+# (bake_assets.py) can share file_hash without them.
+
+# Bump when the detection logic below changes so stale layouts are recomputed.
+LAYOUT_VERSION = 1
+
+TEMPLATE_NAME_KEYWORDS = ["Mohd", "Sharukh"]
+TEMPLATE_DOB = "13/03/1996"
+TEMPLATE_UID = "455158937035"
+TEMPLATE_VID = "9163912924645515"
+
+_memory_cache = {}
+
+def ensure_cache_dir():
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp", "layout_cache")
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+@lru_cache(maxsize=1024)
+def _hash_file(path, mtime_ns, size):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def file_hash(path):
+    """sha256 of a file, only re-read when its path, mtime or size changes."""
+    stat = os.stat(path)
+    return _hash_file(os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+def find_bbox(data, target, group_size=1):
+    for i in range(len(data["text"]) - (group_size - 1)):
+        group = data["text"][i:i + group_size]
+        joined = "".join(group).replace(" ", "")
+        if joined == target.replace(" ", ""):
+            x1 = data["left"][i]
+            y1 = min(data["top"][i + j] for j in range(group_size))
+            x2 = data["left"][i + group_size - 1] + data["width"][i + group_size - 1]
+            y2 = max(data["top"][i + j] + data["height"][i + j] for j in range(group_size))
+            return [x1, y1, x2, y2]
+    return None
+
+def get_name_bbox(data, keywords):
+    name_coords = None
+    for i, word in enumerate(data["text"]):
+        if any(k.lower() in word.lower() for k in keywords):
+            x, y, w, h = data["left"][i], data["top"][i], data["width"][i], data["height"][i]
+            if name_coords is None:
+                name_coords = [x, y, x + w, y + h]
+            else:
+                name_coords[0] = min(name_coords[0], x)
+                name_coords[1] = min(name_coords[1], y)
+                name_coords[2] = max(name_coords[2], x + w)
+                name_coords[3] = max(name_coords[3], y + h)
+    return name_coords
+
+def compute_layout(rgb_image):
+    """Run Tesseract once over the template and locate the editable fields."""
+    from ocrcache import cached_image_to_data
+    data = cached_image_to_data(rgb_image)
+    height, width = rgb_image.shape[:2]
+    return {
+        "version": LAYOUT_VERSION,
+        "width": width,
+        "height": height,
+        "name": get_name_bbox(data, TEMPLATE_NAME_KEYWORDS),
+        "dob": find_bbox(data, TEMPLATE_DOB, group_size=1),
+        "uid": find_bbox(data, TEMPLATE_UID, group_size=3),
+        "vid": find_bbox(data, TEMPLATE_VID, group_size=4),
+    }
+
+def _write_atomic(path, payload):
+    # Several worker processes may race on a cold cache; replace() keeps readers
+    # from ever seeing a half-written file.
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+def get_template_layout(template_path, rgb_image=None):
+    """
+    Returns the field boxes (name, dob, uid, vid) of a template image.
+    Layouts are keyed by the template's file hash and persisted under temp/layout_cache,
+    so OCR only runs the first time a given template is seen.
+    """
+    key = file_hash(template_path)
+    layout = _memory_cache.get(key)
+    if layout is not None:
+        return layout
+
+    cache_path = os.path.join(ensure_cache_dir(), f"{key}.json")
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path) as f:
+                layout = json.load(f)
+            if layout.get("version") == LAYOUT_VERSION:
+                _memory_cache[key] = layout
+                return layout
+        except (OSError, ValueError):
+            pass
+
+    if rgb_image is None:
+        import cv2
+        image = cv2.imread(template_path)
+        if image is None:
+            raise FileNotFoundError(f"Template image not found at {template_path}")
+        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+    print(f"Computing template layout for {template_path}")
+    layout = compute_layout(rgb_image)
+    _write_atomic(cache_path, layout)
+    _memory_cache[key] = layout
+    return layout
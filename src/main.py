@@ -1,40 +1,27 @@
 import os
 import re
+import json
 import subprocess
 import tempfile
 import gradio as gr
 from cvprocessor import main as edit_aadhar
-from aiprocessor import generate_aadhar_image
+from aiprocessor import (generate_aadhar_image, generate_aadhar_batch, build_ai_prompt, preload_models,
+                         PERFORMANCE_PROFILES, profile_summary as ai_profile_summary)
 from partialgenprocessor import create_partial_id, RedactionOption
 from inpaintprocessor import flux_inpaint_ui
+from ocrpool import warm_up_in_background
+from fieldmap import extract_fields
+from sprites import occlude_with_sprite
+from blenderpool import get_blender_pool
+from placement import solve_pose
+from occlusion_fallback import run_fallback_occlusion
+from occlusionclient import (baked_asset_paths, read_variant_manifest, find_blender, default_assets,
+                             RENDER_PROFILES, profile_summary)
 
 # --- OCR Field Detection Utility ---
 def get_field_bbox(image_path, target_field):
-    import easyocr
-    import numpy as np
-    import cv2
-
-    reader = easyocr.Reader(['en'], gpu=False)
-    results = reader.readtext(image_path)
-    image = cv2.imread(image_path)
-    height, width = image.shape[:2]
-
-    for bbox, text, prob in results:
-        text_lower = text.lower()
-        if target_field == "aadhar_number" and re.search(r'\d{4}\s*\d{4}\s*\d{4}', text_lower):
-            # bbox: [[x1,y1],[x2,y2],[x3,y3],[x4,y4]]
-            x_coords = [pt[0] for pt in bbox]
-            y_coords = [pt[1] for pt in bbox]
-            return [min(x_coords), min(y_coords), max(x_coords), max(y_coords)], width, height
-        elif target_field == "name" and any(k in text_lower for k in ["name", "mohd", "sharukh"]):
-            x_coords = [pt[0] for pt in bbox]
-            y_coords = [pt[1] for pt in bbox]
-            return [min(x_coords), min(y_coords), max(x_coords), max(y_coords)], width, height
-        elif target_field == "dob" and re.search(r'\d{1,2}[-/.]\d{1,2}[-/.]\d{2,4}', text_lower):
-            x_coords = [pt[0] for pt in bbox]
-            y_coords = [pt[1] for pt in bbox]
-            return [min(x_coords), min(y_coords), max(x_coords), max(y_coords)], width, height
-    return None, width, height
+    fields = extract_fields(image_path)
+    return fields.bbox(target_field), fields.width, fields.height
 
 def ensure_temp_dir():
     temp_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp")
@@ -56,28 +43,98 @@ def run_blender_occlusion(
     coin_model, coin_texture,
     pen_model, pen_texture,
     pencil_model,pencil_texture,
-   
+    use_server=True,
+    base_scene=None,
+    asset_library=None,
+    variants=None,
+    profile=None,
+    region_only=False,
+    coverage_range=None,
+    sprite=False,
 ):
-    cmd = [
-        blender_executable, "--background",
-        "--python", occlusion_script,
-        "--",
-        "--img_path", img_path,
-        "--object_type", object_type,
-        "--field", field,
-        "--render_path", render_path,
-        "--field_bbox", str(field_bbox[0]), str(field_bbox[1]), str(field_bbox[2]), str(field_bbox[3]),
-        "--img_width", str(img_width),
-        "--img_height", str(img_height),
-        "--coin_model", coin_model,
-        "--coin_texture", coin_texture,
-        "--pen_model", pen_model,
-        "--pen_texture", pen_texture,
-        "--pencil_model", pencil_model,
-        "--pencil_texture", pencil_texture
-    ]
+    """
+    Renders one occluder over the field, or with variants (a list of dicts with
+    object_type, offset, rotation, scale, light_energy, or a count of random ones)
+    renders them all in one Blender animation and returns the list of render paths.
+    profile picks one of occlusionclient.RENDER_PROFILES (the script default is "final").
+    region_only renders just the occluder's neighbourhood and pastes it into the card.
+    coverage_range (e.g. (0.4, 0.7)) picks a pose that hides that share of the field before rendering.
+    sprite composites a cached sprite of the pose (sprites.py) instead of rendering the card.
+    """
+    if not blender_executable:
+        # No Blender on this host: the 2.5D NumPy renderer takes the same job.
+        return run_fallback_occlusion(img_path, render_path, object_type, field, field_bbox, img_width, img_height,
+                                      variants=variants, coverage_range=coverage_range)
+    if field_bbox is None:
+        # Generated cards carry a sidecar with exact boxes, so this normally skips OCR.
+        field_bbox, img_width, img_height = get_field_bbox(img_path, field)
+        if field_bbox is None:
+            raise ValueError(f"Could not find bounding box for field '{field}'.")
+
+    job = {
+        "img_path": img_path,
+        "object_type": object_type,
+        "field": field,
+        "render_path": render_path,
+        "field_bbox": [float(v) for v in field_bbox],
+        "img_width": int(img_width),
+        "img_height": int(img_height),
+        "coin_model": coin_model,
+        "coin_texture": coin_texture,
+        "pen_model": pen_model,
+        "pen_texture": pen_texture,
+        "pencil_model": pencil_model,
+        "pencil_texture": pencil_texture,
+    }
+    if base_scene is None and asset_library is None:
+        base_scene, asset_library = baked_asset_paths()
+    if base_scene and asset_library:
+        # Pre-baked scene and occluder library: no scene rebuild or FBX import per render.
+        job["base_scene"] = base_scene
+        job["asset_library"] = asset_library
+    if variants:
+        job["variants"] = variants
+    if profile:
+        job["profile"] = profile
+    if region_only:
+        job["region_only"] = True
+    if coverage_range:
+        fields = {name: list(result.bbox) for name, result in extract_fields(img_path).items()}
+        fields[field] = list(field_bbox)
+        # Region renders and sprites are pasted onto the card itself, with square pixels.
+        pose = solve_pose(object_type, fields, field, img_width, img_height, coverage_range,
+                          aligned=region_only or sprite, sprite_grid=sprite)
+        if pose is None:
+            raise ValueError(f"No {object_type} pose covers {coverage_range} of '{field}'.")
+        job.update({k: pose[k] for k in ("offset", "rotation", "scale")})
+
+    if sprite:
+        assets = {k: job[k] for k in ("coin_model", "coin_texture", "pen_model", "pen_texture", "pencil_model",
+                                      "pencil_texture")}
+        pose = {k: job[k] for k in ("offset", "rotation", "scale") if k in job}
+        return occlude_with_sprite(img_path, render_path, object_type, field_bbox, blender_executable,
+                                   occlusion_script, assets, profile or "balanced", pose=pose)
+
+    if use_server:
+        # Long-lived Blender workers render every job; startup is paid once per worker.
+        response = get_blender_pool(blender_executable, occlusion_script).render(job)
+        return response.get("render_paths", render_path)
+
+    cmd = [blender_executable, "--background", "--python", occlusion_script, "--"]
+    for key, value in job.items():
+        cmd.append(f"--{key}")
+        if value is True:
+            continue
+        if key == "variants":
+            cmd.append(json.dumps(value))
+        elif isinstance(value, list):
+            cmd.extend(str(v) for v in value)
+        else:
+            cmd.append(str(value))
 
     subprocess.run(cmd, check=True)
+    if variants:
+        return [v["render_path"] for v in read_variant_manifest(render_path)["variants"]]
     return render_path
 
 
@@ -130,7 +187,7 @@ def process_aadhar_card(input_image, redaction_option=None, apply_blur=False, ou
     except Exception as e:
         return f"Error: {str(e)}", None
 
-def generate_aadhar_card(prompt, generation_method="cv", apply_blur=False):
+def generate_aadhar_card(prompt, generation_method="cv", apply_blur=False, ai_profile="default"):
     name, dob, aadhar_number, vid = extract_details_from_prompt(prompt)
     if not any([name, dob, aadhar_number]):
         return "Could not extract any valid information. Please provide name, DOB, or Aadhar number.", None
@@ -140,14 +197,9 @@ def generate_aadhar_card(prompt, generation_method="cv", apply_blur=False):
     output_image_path = os.path.join(temp_dir, "generated_aadhar.jpg")
     try:
         if generation_method == "ai":
-            ai_prompt = f"Aadhar card for {name or 'Random User'}"
-            if dob:
-                ai_prompt += f", born on {dob}"
-            if aadhar_number:
-                ai_prompt += f", Aadhar number {aadhar_number}"
-            if vid:
-                ai_prompt += f", VID {vid}"
-            result_path = generate_aadhar_image(ai_prompt, output_path=output_image_path, apply_blur_effect=apply_blur)
+            ai_prompt = build_ai_prompt(name, dob, aadhar_number, vid)
+            result_path = generate_aadhar_image(ai_prompt, output_path=output_image_path, apply_blur_effect=apply_blur,
+                                                profile=ai_profile)
         else:            
             result_path = edit_aadhar(
                 image_path=input_image_path,
@@ -165,6 +217,16 @@ def generate_aadhar_card(prompt, generation_method="cv", apply_blur=False):
     except Exception as e:
         return f"Error: {str(e)}", None
 
+def generate_aadhar_cards_ai(prompts, batch_size=4, num_images_per_prompt=1, apply_blur=False, ai_profile="default"):
+    """AI generation for many prompts at once, micro-batched through one pipeline."""
+    details = [extract_details_from_prompt(prompt) for prompt in prompts]
+    details = [card for card in details if any(card[:3])]
+    if not details:
+        return "Could not extract any valid information from the prompts.", []
+    paths = generate_aadhar_batch(details, batch_size=batch_size, num_images_per_prompt=num_images_per_prompt,
+                                  apply_blur_effect=apply_blur, profile=ai_profile)
+    return f"Generated {len(paths)} Aadhaar cards.", paths
+
 # --- Gradio UI ---
 def setup_gradio_ui():
     def update_input_accessibility(partial):
@@ -185,6 +247,8 @@ def setup_gradio_ui():
                     with gr.Column(scale=2):
                         prompt_input = gr.Textbox(label="Prompt", placeholder="Describe the Aadhaar details...")
                         generation_method = gr.Radio(["CV-based", "AI-based"], label="Generation Method", value="CV-based")
+                        ai_profile = gr.Dropdown(list(PERFORMANCE_PROFILES), label="AI Performance Profile", value="default",
+                                                 info=ai_profile_summary(), visible=False)
 
                         with gr.Group(visible=True) as cv_options:
                             partial_id = gr.Checkbox(label="Process Existing ID", value=False)
@@ -196,11 +260,18 @@ def setup_gradio_ui():
                             apply_occlusion = gr.Checkbox(label="Apply Physical Occlusion", value=False)
                             occlude_field = gr.Dropdown(["aadhar_number", "dob"], label="Field to Occlude", visible=False)
                             occlude_object = gr.Dropdown(["coin", "pen","pencil"], label="Object", visible=False)
+                            occlusion_mode = gr.Radio(["Blender render", "Sprite cache", "2.5D fast (no Blender)"],
+                                                      label="Occlusion Mode",
+                                                      value="Blender render" if find_blender() else "2.5D fast (no Blender)",
+                                                      visible=False,
+                                                      info="Sprite cache renders each occluder pose once and reuses it on every card")
+                            render_profile = gr.Dropdown(list(RENDER_PROFILES), label="Render Profile", value="balanced",
+                                                         info=profile_summary(), visible=False)
 
                             apply_occlusion.change(
-                                fn=lambda show: (gr.update(visible=show), gr.update(visible=show)),
+                                fn=lambda show: tuple(gr.update(visible=show) for _ in range(4)),
                                 inputs=[apply_occlusion],
-                                outputs=[occlude_field, occlude_object]
+                                outputs=[occlude_field, occlude_object, occlusion_mode, render_profile]
                             )
 
                         generate_btn = gr.Button("Generate/Process Aadhaar Card")
@@ -209,7 +280,7 @@ def setup_gradio_ui():
                         output_image = gr.Image(label="Result")
                         status_text = gr.Textbox(label="Status", interactive=False)
 
-                def process_input(prompt, method, partial, upload_img, redact_opt, blur, occlude, field, obj):
+                def process_input(prompt, method, partial, upload_img, redact_opt, blur, occlude, field, obj, mode, profile, ai_prof):
                     # Step 1: Generate/process card
                     if method == "CV-based" and partial:
                         if upload_img is None:
@@ -217,7 +288,7 @@ def setup_gradio_ui():
                         status, result_path = process_aadhar_card(upload_img, redact_opt, blur)
                     else:
                         gen_method = "cv" if method == "CV-based" else "ai"
-                        status, result_path = generate_aadhar_card(prompt, gen_method, blur)
+                        status, result_path = generate_aadhar_card(prompt, gen_method, blur, ai_prof)
 
             
                     if result_path and occlude and field and obj:
@@ -227,25 +298,41 @@ def setup_gradio_ui():
                             return f"Could not find bounding box for field '{field}'.", None
                         temp_dir = ensure_temp_dir()
                         occluded_path = os.path.join(temp_dir, "occluded_render.png")
+                        blender_executable = find_blender()
+                        occlusion_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "occlude_render.py")
+                        assets = default_assets()
                         try:
-                            run_blender_occlusion(
-                                img_path=result_path,
-                                render_path=occluded_path,
-                                object_type=obj,
-                                field=field,
-                                field_bbox=bbox,
-                                img_width=img_width,
-                                img_height=img_height,
-                                blender_executable="D:/Blender/blender.exe", 
-                                occlusion_script="C:/Users/dhaks/Downloads/Hyperverge/src/occlude_render.py",  
-                                coin_model="C:/Users/dhaks/Downloads/Hyperverge/3d-models/indian-coin/source/COIN.fbx",
-                                coin_texture="C:/Users/dhaks/Downloads/Hyperverge/3d-models/indian-coin/textures/COIN.png",
-                                pen_model="C:/Users/dhaks/Downloads/Hyperverge/3d-models/the-pen/source/Pen_Low.fbx",
-                                pen_texture="C:/Users/dhaks/Downloads/Hyperverge/3d-models/the-pen/textures/Ruchka_Normal_DirectX.png",
-                                pencil_model="C:/Users/dhaks/Downloads/Hyperverge/3d-models/pencil/source/Pencil.fbx",  
-                                pencil_texture="C:/Users/dhaks/Downloads/Hyperverge/3d-models/pencil/textures/Pencil_normal.png"  
-                                
-                            )
+                            if mode == "2.5D fast (no Blender)" or blender_executable is None:
+                                run_fallback_occlusion(result_path, occluded_path, obj, field, bbox, img_width, img_height)
+                            elif mode == "Sprite cache":
+                                run_blender_occlusion(
+                                    img_path=result_path,
+                                    render_path=occluded_path,
+                                    object_type=obj,
+                                    field=field,
+                                    field_bbox=bbox,
+                                    img_width=img_width,
+                                    img_height=img_height,
+                                    blender_executable=blender_executable,
+                                    occlusion_script=occlusion_script,
+                                    profile=profile,
+                                    sprite=True,
+                                    **assets,
+                                )
+                            else:
+                                run_blender_occlusion(
+                                    img_path=result_path,
+                                    render_path=occluded_path,
+                                    object_type=obj,
+                                    field=field,
+                                    field_bbox=bbox,
+                                    img_width=img_width,
+                                    img_height=img_height,
+                                    blender_executable=blender_executable,
+                                    occlusion_script=occlusion_script,
+                                    profile=profile,
+                                    **assets,
+                                )
                             status = f"Occlusion render successful with {obj} on {field}."
                             result_path = occluded_path
                         except Exception as e:
@@ -254,6 +341,7 @@ def setup_gradio_ui():
                     return status, result_path
 
                 generation_method.change(fn=lambda x: x == "CV-based", inputs=[generation_method], outputs=[cv_options])
+                generation_method.change(fn=lambda x: gr.update(visible=x == "AI-based"), inputs=[generation_method], outputs=[ai_profile])
                 partial_id.change(
                     fn=update_input_accessibility, 
                     inputs=[partial_id], 
@@ -265,7 +353,7 @@ def setup_gradio_ui():
                     inputs=[
                         prompt_input, generation_method, partial_id,
                         upload_image, redaction_options, apply_blur,
-                        apply_occlusion, occlude_field, occlude_object
+                        apply_occlusion, occlude_field, occlude_object, occlusion_mode, render_profile, ai_profile
                     ],
                     outputs=[status_text, output_image]
                 )
@@ -279,4 +367,6 @@ demo = setup_gradio_ui()
 
 if __name__ == "__main__":
     ensure_temp_dir()
+    warm_up_in_background(['en'], gpu=False)
+    preload_models()
     demo.launch()
@@ -0,0 +1,114 @@
+import gc
+import os
+import threading
+from collections import OrderedDict
+
+# Diffusion pipelines take longer to construct than to run, so each one is built once and
+# kept resident. When the resident models exceed the memory budget, the least recently used
+# ones are dropped.
+BUDGET_MB = int(os.environ.get("HYPERGEN_MODEL_BUDGET_MB", "0"))
+
+def default_budget_bytes():
+    if BUDGET_MB:
+        return BUDGET_MB * 1024 * 1024
+    try:
+        # Half of physical memory; the OCR readers and the app need the rest.
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // 2
+    except (AttributeError, ValueError, OSError):
+        return None
+
+def model_bytes(model):
+    """Parameter and buffer bytes of a torch module or of every module in a diffusers pipeline."""
+    modules = getattr(model, "components", None)
+    modules = modules.values() if isinstance(modules, dict) else [model]
+    total = 0
+    for module in modules:
+        if hasattr(module, "parameters"):
+            total += sum(p.numel() * p.element_size() for p in module.parameters())
+            total += sum(b.numel() * b.element_size() for b in module.buffers())
+    return total
+
+class ModelRegistry:
+    def __init__(self, budget_bytes=None):
+        self.budget_bytes = budget_bytes
+        self._loaders = {}
+        self._models = OrderedDict()  # name -> (model, bytes), least recently used first
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def register(self, name, loader):
+        """loader() builds the model; it is only called on first use (or after eviction)."""
+        with self._lock:
+            self._loaders[name] = loader
+            self._load_locks.setdefault(name, threading.Lock())
+
+    def loaded(self, name):
+        with self._lock:
+            return name in self._models
+
+    def get(self, name):
+        with self._lock:
+            if name in self._models:
+                self._models.move_to_end(name)
+                return self._models[name][0]
+            if name not in self._loaders:
+                raise KeyError(f"No model registered as '{name}'")
+            load_lock = self._load_locks[name]
+
+        # One thread loads; concurrent callers for the same model wait for it.
+        with load_lock:
+            with self._lock:
+                if name in self._models:
+                    self._models.move_to_end(name)
+                    return self._models[name][0]
+            print(f"Loading model '{name}'")
+            model = self._loaders[name]()
+            size = model_bytes(model)
+            with self._lock:
+                self._models[name] = (model, size)
+                self._evict_over_budget(keep=name)
+            print(f"Model '{name}' resident ({size / 2**20:.0f} MB)")
+            return model
+
+    def _evict_over_budget(self, keep):
+        if self.budget_bytes is None:
+            return
+        evicted = []
+        while sum(size for _, size in self._models.values()) > self.budget_bytes:
+            name = next((n for n in self._models if n != keep), None)
+            if name is None:
+                break
+            del self._models[name]
+            evicted.append(name)
+        if evicted:
+            print(f"Evicted models over the memory budget: {', '.join(evicted)}")
+            _release_memory()
+
+    def evict(self, name):
+        with self._lock:
+            if self._models.pop(name, None) is None:
+                return
+        _release_memory()
+
+    def preload_in_background(self, names):
+        """Loads models on a daemon thread so the first request doesn't pay for construction."""
+        def _preload():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    print(f"Preloading model '{name}' failed: {e}")
+        thread = threading.Thread(target=_preload, daemon=True)
+        thread.start()
+        return thread
+
+def _release_memory():
+    gc.collect()
+    try:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except ImportError:
+        pass
+
+registry = ModelRegistry(default_budget_bytes())
@@ -3,8 +3,28 @@
 import bpy
 import sys
 import argparse
+import json
 import random
 import os
+import math
+import time
+import traceback
+from contextlib import contextmanager
+
+# The constants shared with the app live in occlusionclient (stdlib-only, so Blender can import it).
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from occlusionclient import (RESPONSE_PREFIX, OBJECT_TYPES, SCALE_RANGES, DEFAULT_LIGHT_ENERGY, RENDER_PROFILES,
+                             DEFAULT_PROFILE, BENCHMARK_PATH)
+
+CARD_MATERIAL = "AadharCardMaterial"
+CARD_TEXTURE_NODE = "CardTexture"
+LIGHT_NAME = "KeyLight"
+
+JOB_ARGS = ["img_path", "object_type", "field", "render_path", "field_bbox", "img_width", "img_height",
+            "coin_model", "coin_texture", "pen_model", "pen_texture", "pencil_model", "pencil_texture"]
+
+SPRITE_ARGS = ["object_type", "scale", "sprite_path", "shadow_path",
+               "coin_model", "coin_texture", "pen_model", "pen_texture", "pencil_model", "pencil_texture"]
 
 def parse_args():
     argv = sys.argv
@@ -13,20 +33,56 @@ def parse_args():
     else:
         argv = []
     parser = argparse.ArgumentParser()
-    parser.add_argument("--img_path", required=True)
-    parser.add_argument("--object_type", required=True, choices=["coin", "pen", "pencil"])
-    parser.add_argument("--field", required=True, choices=["aadhar_number", "name", "dob"])
-    parser.add_argument("--render_path", required=True)
-    parser.add_argument("--field_bbox", nargs=4, type=float, required=True, help="Bounding box x1 y1 x2 y2 for field occlusion")
-    parser.add_argument("--img_width", type=int, required=True)
-    parser.add_argument("--img_height", type=int, required=True)
-    parser.add_argument("--coin_model", required=True)
-    parser.add_argument("--coin_texture", required=True)
-    parser.add_argument("--pen_model", required=True)
-    parser.add_argument("--pen_texture", required=True)
-    parser.add_argument("--pencil_model", required=True)
-    parser.add_argument("--pencil_texture", required=True)
-    return parser.parse_args(argv)
+    parser.add_argument("--serve", action="store_true", help="Keep Blender alive and read JSON jobs from stdin, one per line")
+    parser.add_argument("--img_path")
+    parser.add_argument("--object_type", choices=OBJECT_TYPES)
+    parser.add_argument("--field", choices=["aadhar_number", "name", "dob"])
+    parser.add_argument("--render_path")
+    parser.add_argument("--field_bbox", nargs=4, type=float, help="Bounding box x1 y1 x2 y2 for field occlusion")
+    parser.add_argument("--img_width", type=int)
+    parser.add_argument("--img_height", type=int)
+    parser.add_argument("--coin_model")
+    parser.add_argument("--coin_texture")
+    parser.add_argument("--pen_model")
+    parser.add_argument("--pen_texture")
+    parser.add_argument("--pencil_model")
+    parser.add_argument("--pencil_texture")
+    parser.add_argument("--base_scene", help="Pre-built scene from bake_assets.py; skips rebuilding the scene")
+    parser.add_argument("--asset_library", help="Baked occluder library from bake_assets.py; skips FBX import")
+    parser.add_argument("--profile", choices=list(RENDER_PROFILES), default=DEFAULT_PROFILE)
+    parser.add_argument("--device", choices=["CPU", "GPU"], default="CPU")
+    parser.add_argument("--threads", type=int, default=0, help="Render threads; 0 uses every core")
+    parser.add_argument("--cpu_cores", help="Comma-separated CPU cores to pin this Blender to (Linux)")
+    parser.add_argument("--memory_mb", type=int, help="Address-space cap for this Blender process (POSIX)")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Render the job once per profile and report time and PSNR against 'final'")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Seeds the benchmark's occluder pose so runs are comparable")
+    parser.add_argument("--benchmark_out", default=BENCHMARK_PATH)
+    parser.add_argument("--region_only", action="store_true",
+                        help="Render only the occluder's screen region and paste it into the original card")
+    parser.add_argument("--region_margin", type=int, default=48, help="Extra pixels around the occluder for its shadow")
+    parser.add_argument("--sprite", action="store_true",
+                        help="Render only the occluder (RGBA) and its shadow for the sprite cache")
+    parser.add_argument("--rotation", type=float, help="Occluder rotation in degrees (default 0)")
+    parser.add_argument("--scale", type=float, help="Occluder scale; random within the object's range if omitted")
+    parser.add_argument("--offset", nargs=2, type=float, help="Occluder offset dx dy in pixels from the field centre")
+    parser.add_argument("--light_energy", type=float, default=DEFAULT_LIGHT_ENERGY)
+    parser.add_argument("--sprite_ppu", type=int, default=400, help="Sprite pixels per Blender unit")
+    parser.add_argument("--sprite_path", help="Output RGBA occluder sprite")
+    parser.add_argument("--shadow_path", help="Output shadow pass; its alpha is the shadow opacity")
+    parser.add_argument("--jobs", help="JSONL job-spec file (see occlusion_jobs.py); renders every spec in this process")
+    parser.add_argument("--variants", type=json.loads,
+                        help="JSON list of variants (object_type, offset [dx, dy] px, rotation deg, scale, light_energy) "
+                             "or a count of random variants; rendered as frames of one animation")
+    args = parser.parse_args(argv)
+    # In server mode the job arguments arrive with each request instead.
+    if not args.serve and not args.jobs:
+        required = SPRITE_ARGS if args.sprite else JOB_ARGS
+        missing = [name for name in required if getattr(args, name) is None]
+        if missing:
+            parser.error("missing required arguments: " + ", ".join("--" + name for name in missing))
+    return args
 
 def pixel_to_blender_coords(bbox, image_width, image_height, plane_size=2):
     x1, y1, x2, y2 = bbox
@@ -38,20 +94,8 @@ def pixel_to_blender_coords(bbox, image_width, image_height, plane_size=2):
     blender_y = (0.5 - norm_y) * plane_size  # Y axis flipped
     return blender_x, blender_y
 
-def add_object(object_type, args, obj_x, obj_y):
-    if object_type == "coin":
-        fbx_path = args.coin_model
-        texture_path = args.coin_texture
-        scale_range = (0.10, 0.25)
-    elif object_type == "pen":
-        fbx_path = args.pen_model
-        texture_path = args.pen_texture
-        scale_range = (0.4, 0.6)
-    elif object_type == "pencil":
-        fbx_path = args.pencil_model
-        texture_path = args.pencil_texture
-        scale_range = (0.4, 0.6)
-
+def import_occluder(object_type, fbx_path, texture_path):
+    """Imports an FBX, joins its meshes into one object and gives it a textured material."""
     bpy.ops.import_scene.fbx(filepath=fbx_path)
     imported_objects = [obj for obj in bpy.context.selected_objects if obj.type == 'MESH']
     if not imported_objects:
@@ -66,11 +110,6 @@ def add_object(object_type, args, obj_x, obj_y):
     obj = bpy.context.active_object
     obj.name = object_type.capitalize()
 
-    rand_scale = random.uniform(*scale_range)
-    obj.scale = (rand_scale, rand_scale, rand_scale)
-    obj.location = (obj_x, obj_y, 0.015)
-    obj.rotation_euler = (0, 0, 0)
-
     mat = bpy.data.materials.new(name=f"{object_type.capitalize()}Material")
     mat.use_nodes = True
     nodes = mat.node_tree.nodes
@@ -86,12 +125,34 @@ def add_object(object_type, args, obj_x, obj_y):
     obj.data.materials.append(mat)
     return obj
 
-def main():
-    args = parse_args()
-    # Clean scene
+def place_object(obj, object_type, obj_x, obj_y, scale=None, rotation=0):
+    if scale is None:
+        scale = random.uniform(*SCALE_RANGES[object_type])
+    obj.scale = (scale, scale, scale)
+    obj.location = (obj_x, obj_y, 0.015)
+    obj.rotation_euler = (0, 0, math.radians(rotation or 0))
+
+def apply_pose(obj, args, obj_x, obj_y, units_x, units_y):
+    """Places the occluder with the job's pose: pixel offset, rotation, scale and light energy."""
+    dx, dy = getattr(args, "offset", None) or (0, 0)
+    place_object(obj, args.object_type, obj_x + dx * units_x, obj_y - dy * units_y,
+                 scale=getattr(args, "scale", None), rotation=getattr(args, "rotation", 0))
+    bpy.data.objects[LIGHT_NAME].data.energy = getattr(args, "light_energy", None) or DEFAULT_LIGHT_ENERGY
+
+def reset_scene():
     bpy.ops.object.select_all(action='SELECT')
     bpy.ops.object.delete()
+    # A long-lived server would otherwise keep every mesh, material and card image it ever loaded.
+    for collection in (bpy.data.meshes, bpy.data.materials, bpy.data.cameras, bpy.data.lights, bpy.data.actions):
+        for block in list(collection):
+            if block.users == 0:
+                collection.remove(block)
+    for image in list(bpy.data.images):
+        if image.users == 0 and image.type == 'IMAGE':
+            bpy.data.images.remove(image)
 
+def build_scene(card_image):
+    """Surface, textured card, orthographic camera and light. card_image is a loaded bpy image."""
     # Add table
     bpy.ops.mesh.primitive_plane_add(size=5, location=(0, 0, -0.01))
     table = bpy.context.active_object
@@ -100,18 +161,19 @@ def main():
     mat.use_nodes = True
     table.data.materials.append(mat)
     mat.node_tree.nodes["Principled BSDF"].inputs["Base Color"].default_value = (0.2, 0.2, 0.2, 1)
-    table.cycles.is_shadow_catcher = True
+    table.is_shadow_catcher = True
 
     # Add card
     bpy.ops.mesh.primitive_plane_add(size=2, location=(0, 0, 0))
     card = bpy.context.active_object
     card.name = "Aadhar_Card"
-    card_mat = bpy.data.materials.new("AadharCardMaterial")
+    card_mat = bpy.data.materials.new(CARD_MATERIAL)
     card_mat.use_nodes = True
     nodes = card_mat.node_tree.nodes
     nodes.clear()
     tex_image = nodes.new("ShaderNodeTexImage")
-    tex_image.image = bpy.data.images.load(args.img_path)
+    tex_image.name = CARD_TEXTURE_NODE
+    tex_image.image = card_image
     diffuse = nodes.new("ShaderNodeBsdfDiffuse")
     output = nodes.new("ShaderNodeOutputMaterial")
     card_mat.node_tree.links.new(tex_image.outputs["Color"], diffuse.inputs["Color"])
@@ -128,9 +190,151 @@ def main():
     # Light
     bpy.ops.object.light_add(type='AREA', location=(0, 0, 5))
     light = bpy.context.active_object
-    light.data.energy = 350
+    light.name = LIGHT_NAME
+    light.data.energy = DEFAULT_LIGHT_ENERGY
     light.data.size = 3
-    bpy.data.worlds["World"].node_tree.nodes["Background"].inputs[1].default_value = 0.1
+    world = bpy.context.scene.world
+    if world is None:
+        world = bpy.data.worlds.new("World")
+        bpy.context.scene.world = world
+    world.use_nodes = True
+    world.node_tree.nodes["Background"].inputs[1].default_value = 0.1
+
+# State of the pre-built scene when running from baked assets, so a server only
+# opens the .blend and links each occluder once.
+_baked = {"scene": None, "occluders": {}}
+
+def load_baked_scene(base_scene):
+    if _baked["scene"] == base_scene:
+        return
+    bpy.ops.wm.open_mainfile(filepath=base_scene)
+    _baked["scene"] = base_scene
+    _baked["occluders"] = {}
+
+def clear_animation():
+    """Drops keyframes left by a previous variant job so single renders see plain values."""
+    scene = bpy.context.scene
+    for obj in scene.objects:
+        obj.animation_data_clear()
+        if obj.data is not None and hasattr(obj.data, "animation_data_clear"):
+            obj.data.animation_data_clear()
+    scene.frame_start = scene.frame_end = scene.frame_current = 1
+
+def baked_occluder(object_type, asset_library):
+    """Links the occluder mesh from the library (once) and shows only that occluder."""
+    name = object_type.capitalize()
+    occluders = _baked["occluders"]
+    if object_type not in occluders:
+        with bpy.data.libraries.load(asset_library, link=True) as (data_from, data_to):
+            if name not in data_from.meshes:
+                raise RuntimeError(f"'{name}' not found in asset library {asset_library}")
+            data_to.meshes = [name]
+        obj = bpy.data.objects.new(name, data_to.meshes[0])
+        bpy.context.scene.collection.objects.link(obj)
+        occluders[object_type] = obj.name
+    for other_type, obj_name in occluders.items():
+        obj = bpy.data.objects[obj_name]
+        obj.hide_render = other_type != object_type
+        obj.hide_viewport = other_type != object_type
+    return bpy.data.objects[occluders[object_type]]
+
+def set_card_image(img_path):
+    node = bpy.data.materials[CARD_MATERIAL].node_tree.nodes[CARD_TEXTURE_NODE]
+    previous = node.image
+    node.image = bpy.data.images.load(img_path)
+    if previous is not None and previous.users == 0:
+        bpy.data.images.remove(previous)
+
+def use_baked_assets(args):
+    base_scene = getattr(args, "base_scene", None)
+    asset_library = getattr(args, "asset_library", None)
+    return bool(base_scene and asset_library and os.path.exists(base_scene) and os.path.exists(asset_library))
+
+def prepare_scene(args):
+    """Loads the baked scene or rebuilds it, ready for occluders to be placed."""
+    if use_baked_assets(args):
+        load_baked_scene(args.base_scene)
+        clear_animation()
+        set_card_image(args.img_path)
+        return True
+    # Clean scene
+    _baked["scene"] = None
+    reset_scene()
+    build_scene(bpy.data.images.load(args.img_path))
+    return False
+
+def get_occluder(object_type, args, baked):
+    if baked:
+        return baked_occluder(object_type, args.asset_library)
+    obj = import_occluder(object_type, getattr(args, f"{object_type}_model"), getattr(args, f"{object_type}_texture"))
+    if obj is None:
+        raise RuntimeError(f"Failed to add object '{object_type}'.")
+    return obj
+
+def eevee_engine():
+    # Blender 4.2-4.x calls the new Eevee BLENDER_EEVEE_NEXT; older and newer versions use BLENDER_EEVEE.
+    engines = bpy.types.RenderSettings.bl_rna.properties["engine"].enum_items.keys()
+    return "BLENDER_EEVEE_NEXT" if "BLENDER_EEVEE_NEXT" in engines else "BLENDER_EEVEE"
+
+def cycles_profile(profile):
+    """The profile itself if it renders with Cycles, else "balanced"; shadow catchers only exist in Cycles."""
+    profile = profile or DEFAULT_PROFILE
+    if RENDER_PROFILES[profile]["engine"] == "CYCLES":
+        return profile
+    print(f"Profile '{profile}' has no shadow catcher; using 'balanced' instead.")
+    return "balanced"
+
+@contextmanager
+def standard_view(scene):
+    """
+    'Standard' view transform for the renders pasted into the card (region crops and sprites),
+    so the occluder's tones match the untouched card pixels. Restored afterwards.
+    """
+    view_transform = scene.view_settings.view_transform
+    scene.view_settings.view_transform = 'Standard'
+    try:
+        yield
+    finally:
+        scene.view_settings.view_transform = view_transform
+
+def apply_render_settings(args):
+    profile = RENDER_PROFILES[getattr(args, "profile", None) or DEFAULT_PROFILE]
+    scene = bpy.context.scene
+    render = scene.render
+    render.resolution_x = args.img_width
+    render.resolution_y = args.img_height
+    render.image_settings.file_format = 'PNG'
+    render.film_transparent = False
+    render.use_border = False
+    render.use_crop_to_border = False
+    # Keeps BVH and textures between renders of a server or an animation.
+    render.use_persistent_data = profile.get("persistent_data", False)
+    threads = getattr(args, "threads", 0) or 0
+    render.threads_mode = 'FIXED' if threads > 0 else 'AUTO'
+    if threads > 0:
+        render.threads = threads
+
+    if profile["engine"] == "EEVEE":
+        render.engine = eevee_engine()
+        scene.eevee.taa_render_samples = profile["samples"]
+        return scene
+
+    render.engine = 'CYCLES'
+    cycles = scene.cycles
+    cycles.device = getattr(args, "device", None) or "CPU"
+    cycles.samples = profile["samples"]
+    cycles.use_adaptive_sampling = True
+    cycles.adaptive_threshold = profile["adaptive_threshold"]
+    cycles.max_bounces = profile["max_bounces"]
+    cycles.use_denoising = profile["denoise"]
+    if profile["denoise"]:
+        cycles.denoiser = 'OPENIMAGEDENOISE'
+    cycles.use_auto_tile = True
+    cycles.tile_size = profile["tile_size"]
+    return scene
+
+def render_job(args):
+    baked = prepare_scene(args)
 
     # Calculate object position from bbox
     obj_x, obj_y = pixel_to_blender_coords(
@@ -138,23 +342,432 @@ def main():
     )
 
     # Add object at calculated position
-    obj = add_object(args.object_type, args, obj_x, obj_y)
-    if obj is None:
-        print("Failed to add object.")
-        return
+    obj = get_occluder(args.object_type, args, baked)
+    apply_pose(obj, args, obj_x, obj_y, 2 / args.img_width, 2 / args.img_height)
 
     # Render settings
-    scene = bpy.context.scene
-    scene.render.engine = 'CYCLES'
-    scene.cycles.device = 'GPU'
-    scene.render.resolution_x = args.img_width
-    scene.render.resolution_y = args.img_height
-    scene.render.image_settings.file_format = 'PNG'
+    scene = apply_render_settings(args)
     scene.render.filepath = args.render_path
-    scene.cycles.samples = 256
 
     bpy.ops.render.render(write_still=True)
     print("Rendered with {} at: {}".format(args.object_type, args.render_path))
+    return args.render_path
+
+def occluder_region(scene, obj, width, height, margin):
+    """Pixel box (x0, y0, x1, y1), top-left origin, covering the occluder plus a shadow margin."""
+    from bpy_extras.object_utils import world_to_camera_view
+    from mathutils import Vector
+    bpy.context.view_layer.update()
+    points = [world_to_camera_view(scene, scene.camera, obj.matrix_world @ Vector(corner)) for corner in obj.bound_box]
+    xs = [p.x * width for p in points]
+    ys = [(1 - p.y) * height for p in points]
+    # Soft shadows spread further from larger objects.
+    pad_x = margin + (max(xs) - min(xs)) * 0.25
+    pad_y = margin + (max(ys) - min(ys)) * 0.25
+    x0 = max(0, int(math.floor(min(xs) - pad_x)))
+    y0 = max(0, int(math.floor(min(ys) - pad_y)))
+    x1 = min(width, int(math.ceil(max(xs) + pad_x)))
+    y1 = min(height, int(math.ceil(max(ys) + pad_y)))
+    return x0, y0, x1, y1
+
+def paste_region(card_path, crop_path, region, output_path):
+    """Alpha-composites the rendered crop over the original card pixels and saves the full card."""
+    import numpy as np
+    x0, y0, x1, y1 = region
+    card = bpy.data.images.load(card_path, check_existing=False)
+    crop = bpy.data.images.load(crop_path, check_existing=False)
+    width, height = card.size
+    card_px = np.empty(width * height * 4, dtype=np.float32)
+    card.pixels.foreach_get(card_px)
+    crop_w, crop_h = crop.size
+    crop_px = np.empty(crop_w * crop_h * 4, dtype=np.float32)
+    crop.pixels.foreach_get(crop_px)
+
+    # Blender images are stored bottom row first.
+    card_px = card_px.reshape(height, width, 4)
+    crop_px = crop_px.reshape(crop_h, crop_w, 4)
+    bottom = height - y1
+    # Border rounding can make the crop a pixel larger than the requested box.
+    crop_h, crop_w = min(crop_h, height - bottom), min(crop_w, width - x0)
+    crop_px = crop_px[:crop_h, :crop_w]
+    target = card_px[bottom:bottom + crop_h, x0:x0 + crop_w]
+    alpha = crop_px[..., 3:4]
+    target[..., :3] = target[..., :3] * (1 - alpha) + crop_px[..., :3] * alpha
+    target[..., 3] = 1.0
+
+    out = bpy.data.images.new("RegionComposite", width, height, alpha=False)
+    out.pixels.foreach_set(card_px.ravel())
+    out.filepath_raw = output_path
+    out.file_format = 'PNG'
+    out.save()
+    for image in (card, crop, out):
+        bpy.data.images.remove(image)
+
+def render_region(args):
+    """
+    Renders only the part of the frame the occluder and its shadow can touch.
+    The camera is aligned so render pixels match card pixels, the card plane turns into a
+    shadow catcher on a transparent film, and the cropped occluder + shadow is alpha-composited
+    into the original card image.
+    """
+    baked = prepare_scene(args)
+    scene = bpy.context.scene
+    width, height = args.img_width, args.img_height
+    aspect = height / width
+
+    # Card plane 2 units wide with the image's aspect; the camera frames it exactly.
+    card = bpy.data.objects["Aadhar_Card"]
+    card.scale = (1, aspect, 1)
+    card.is_shadow_catcher = True
+    bpy.data.objects["Surface"].hide_render = True
+    scene.camera.location = (0, 0, 3)
+    scene.camera.data.type = 'ORTHO'
+    scene.camera.data.sensor_fit = 'HORIZONTAL'
+    scene.camera.data.ortho_scale = 2
+
+    x0, y0, x1, y1 = args.field_bbox
+    obj_x = ((x0 + x1) / 2 / width - 0.5) * 2
+    obj_y = (0.5 - (y0 + y1) / 2 / height) * 2 * aspect
+    obj = get_occluder(args.object_type, args, baked)
+    # Pixels are square on the aligned card plane.
+    apply_pose(obj, args, obj_x, obj_y, 2 / width, 2 / width)
+
+    # The transparent catcher card is what lets the crop be pasted without a seam.
+    apply_render_settings(argparse.Namespace(**dict(vars(args), profile=cycles_profile(args.profile))))
+    region = occluder_region(scene, obj, width, height, args.region_margin)
+    rx0, ry0, rx1, ry1 = region
+    render = scene.render
+    render.film_transparent = True
+    render.image_settings.color_mode = 'RGBA'
+    render.use_border = True
+    render.use_crop_to_border = True
+    render.border_min_x, render.border_max_x = rx0 / width, rx1 / width
+    render.border_min_y, render.border_max_y = (height - ry1) / height, (height - ry0) / height
+
+    crop_path = os.path.splitext(args.render_path)[0] + "_region.png"
+    render.filepath = crop_path
+    try:
+        with standard_view(scene):
+            bpy.ops.render.render(write_still=True)
+    finally:
+        # Card, camera and film were changed in place; the next job starts from a clean scene.
+        _baked["scene"] = None
+    paste_region(args.img_path, crop_path, region, args.render_path)
+    os.remove(crop_path)
+    print("Rendered {}x{} region with {} at: {}".format(rx1 - rx0, ry1 - ry0, args.object_type, args.render_path))
+    return args.render_path
+
+def random_variants(count, args):
+    """Random occluder variants jittered around the field box."""
+    x1, y1, x2, y2 = args.field_bbox
+    jitter_x, jitter_y = (x2 - x1) / 2, (y2 - y1) / 2
+    variants = []
+    for _ in range(count):
+        object_type = random.choice(OBJECT_TYPES) if args.object_type is None else args.object_type
+        variants.append({
+            "object_type": object_type,
+            "offset": [random.uniform(-jitter_x, jitter_x), random.uniform(-jitter_y, jitter_y)],
+            "rotation": random.uniform(0, 360),
+            "scale": random.uniform(*SCALE_RANGES[object_type]),
+            "light_energy": random.uniform(0.7, 1.3) * DEFAULT_LIGHT_ENERGY,
+        })
+    return variants
+
+def normalize_variant(variant, args):
+    object_type = variant.get("object_type") or args.object_type
+    if object_type not in OBJECT_TYPES:
+        raise ValueError(f"Unknown object_type '{object_type}' in variant.")
+    dx, dy = variant.get("offset", (0, 0))
+    scale = variant.get("scale")
+    return {
+        "object_type": object_type,
+        "offset": [float(dx), float(dy)],
+        "rotation": float(variant.get("rotation", 0)),
+        "scale": float(scale) if scale is not None else random.uniform(*SCALE_RANGES[object_type]),
+        "light_energy": float(variant.get("light_energy", DEFAULT_LIGHT_ENERGY)),
+    }
+
+def variant_output_paths(render_path, count):
+    """Blender writes frame N of '<root>_####' as '<root>_000N.png'."""
+    root = os.path.splitext(render_path)[0]
+    pattern = root + "_####"
+    paths = [f"{root}_{frame:04d}.png" for frame in range(1, count + 1)]
+    return pattern, paths, root + "_variants.json"
+
+def render_variants(args):
+    """
+    Renders every variant as one frame of a single animation, so scene setup, asset
+    loading and BVH builds happen once per card instead of once per variant.
+    Writes numbered PNGs and a JSON manifest next to render_path.
+    """
+    variants = args.variants
+    if isinstance(variants, int):
+        variants = random_variants(variants, args)
+    variants = [normalize_variant(v, args) for v in variants]
+    if not variants:
+        raise ValueError("No variants to render.")
+
+    baked = prepare_scene(args)
+    occluders = {}
+    for variant in variants:
+        object_type = variant["object_type"]
+        if object_type not in occluders:
+            occluders[object_type] = get_occluder(object_type, args, baked)
+    light = bpy.data.objects[LIGHT_NAME]
+
+    center_x, center_y = pixel_to_blender_coords(args.field_bbox, args.img_width, args.img_height, plane_size=2)
+    # The card plane is 2 units across both axes, stretched to the image size.
+    units_x, units_y = 2 / args.img_width, 2 / args.img_height
+
+    for frame, variant in enumerate(variants, start=1):
+        for object_type, obj in occluders.items():
+            hidden = object_type != variant["object_type"]
+            obj.hide_render = hidden
+            obj.keyframe_insert("hide_render", frame=frame)
+        obj = occluders[variant["object_type"]]
+        dx, dy = variant["offset"]
+        obj.location = (center_x + dx * units_x, center_y - dy * units_y, 0.015)
+        obj.rotation_euler = (0, 0, math.radians(variant["rotation"]))
+        obj.scale = (variant["scale"],) * 3
+        for path in ("location", "rotation_euler", "scale"):
+            obj.keyframe_insert(path, frame=frame)
+        light.data.energy = variant["light_energy"]
+        light.data.keyframe_insert("energy", frame=frame)
+
+    scene = apply_render_settings(args)
+    pattern, paths, manifest_path = variant_output_paths(args.render_path, len(variants))
+    scene.render.filepath = pattern
+    scene.frame_start = 1
+    scene.frame_end = len(variants)
+    bpy.ops.render.render(animation=True)
+
+    manifest = {
+        "img_path": args.img_path,
+        "field": args.field,
+        "field_bbox": list(args.field_bbox),
+        "variants": [dict(variant, frame=frame, render_path=path)
+                     for frame, (variant, path) in enumerate(zip(variants, paths), start=1)],
+    }
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    print("Rendered {} variants, manifest at: {}".format(len(variants), manifest_path))
+    return paths, manifest_path
+
+def load_pixels(path):
+    import numpy as np
+    image = bpy.data.images.load(path, check_existing=False)
+    pixels = np.empty(len(image.pixels), dtype=np.float32)
+    image.pixels.foreach_get(pixels)
+    bpy.data.images.remove(image)
+    return pixels
+
+def psnr(reference, pixels):
+    import numpy as np
+    mse = float(np.mean((reference - pixels) ** 2))
+    return float("inf") if mse == 0 else 10 * math.log10(1.0 / mse)
+
+def benchmark_profiles(args):
+    """
+    Renders the same job once per profile and records wall time and PSNR against 'final'.
+    'final' runs first so its timing also absorbs one-off kernel and scene loading.
+    The pose is drawn once from --seed, so every profile renders identical geometry.
+    """
+    rng = random.Random(getattr(args, "seed", 0))
+    x1, y1, x2, y2 = args.field_bbox
+    pose = {
+        "scale": args.scale if args.scale is not None else rng.uniform(*SCALE_RANGES[args.object_type]),
+        "rotation": args.rotation if args.rotation is not None else rng.uniform(0, 360),
+        "offset": args.offset or [rng.uniform(-(x2 - x1) / 4, (x2 - x1) / 4),
+                                  rng.uniform(-(y2 - y1) / 4, (y2 - y1) / 4)],
+        "light_energy": args.light_energy,
+    }
+    root, ext = os.path.splitext(args.render_path)
+    names = ["final"] + [name for name in RENDER_PROFILES if name != "final"]
+    results = {}
+    reference = None
+    for name in names:
+        job = argparse.Namespace(**dict(vars(args), **pose, profile=name,
+                                        render_path=f"{root}_{name}{ext or '.png'}"))
+        try:
+            start = time.perf_counter()
+            render_job(job)
+            seconds = time.perf_counter() - start
+        except Exception as e:
+            print(f"Profile {name} failed: {e}")
+            results[name] = {"error": str(e)}
+            continue
+        pixels = load_pixels(job.render_path)
+        if reference is None:
+            reference = pixels
+        results[name] = {"seconds": round(seconds, 3), "psnr_vs_final": round(psnr(reference, pixels), 2),
+                         "render_path": job.render_path}
+        print(f"{name:>9}: {seconds:.3f}s  PSNR vs final {results[name]['psnr_vs_final']} dB")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.benchmark_out)), exist_ok=True)
+    with open(args.benchmark_out, "w") as f:
+        json.dump({"device": args.device, "threads": args.threads, "seed": getattr(args, "seed", 0), "pose": pose,
+                   "resolution": [args.img_width, args.img_height], "profiles": results}, f, indent=2)
+    print("Benchmark written to: {}".format(args.benchmark_out))
+    return results
+
+def render_sprite(args):
+    """
+    Renders the occluder on its own, centred and camera-aligned, in two passes:
+    the RGBA occluder against a transparent film, then its shadow on the card plane
+    as a shadow catcher (alpha = shadow opacity) with the occluder hidden from camera.
+    The look does not depend on the card, so sprites.py caches and reuses these.
+    """
+    if use_baked_assets(args):
+        load_baked_scene(args.base_scene)
+        clear_animation()
+        baked = True
+    else:
+        _baked["scene"] = None
+        reset_scene()
+        build_scene(bpy.data.images.new("SpriteCard", 4, 4))
+        baked = False
+    scene = bpy.context.scene
+    card = bpy.data.objects["Aadhar_Card"]
+    surface = bpy.data.objects["Surface"]
+    obj = get_occluder(args.object_type, args, baked)
+    obj.location = (0, 0, 0.015)
+    obj.rotation_euler = (0, 0, math.radians(args.rotation or 0))
+    obj.scale = (args.scale,) * 3
+    bpy.data.objects[LIGHT_NAME].data.energy = args.light_energy
+    bpy.context.view_layer.update()
+
+    # Square frame around the occluder footprint plus room for its soft shadow.
+    width, height = obj.dimensions.x, obj.dimensions.y
+    extent = math.hypot(width, height) * 1.3 + 0.1
+    size = max(8, int(math.ceil(extent * args.sprite_ppu)))
+    extent = size / args.sprite_ppu
+    scene.camera.location = (0, 0, 3)
+    scene.camera.rotation_euler = (0, 0, 0)
+    scene.camera.data.type = 'ORTHO'
+    scene.camera.data.ortho_scale = extent
+
+    apply_render_settings(argparse.Namespace(**dict(vars(args), img_width=size, img_height=size,
+                                                    profile=cycles_profile(args.profile))))
+    scene.render.film_transparent = True
+    scene.render.image_settings.color_mode = 'RGBA'
+    surface.hide_render = True
+
+    with standard_view(scene):
+        card.hide_render = True
+        scene.render.filepath = args.sprite_path
+        bpy.ops.render.render(write_still=True)
+
+        card.hide_render = False
+        card.is_shadow_catcher = True
+        obj.visible_camera = False
+        scene.render.filepath = args.shadow_path
+        bpy.ops.render.render(write_still=True)
+
+    # The scene was modified in place; make the next job start from a clean one.
+    _baked["scene"] = None
+    print("Rendered {} sprite at: {}".format(args.object_type, args.sprite_path))
+    return {"sprite_path": args.sprite_path, "shadow_path": args.shadow_path,
+            "size": size, "extent": extent, "ppu": args.sprite_ppu}
+
+def run_job(args):
+    if getattr(args, "sprite", False):
+        return render_sprite(args)
+    if getattr(args, "benchmark", False):
+        return {"benchmark": benchmark_profiles(args)}
+    if getattr(args, "variants", None):
+        paths, manifest_path = render_variants(args)
+        return {"render_paths": paths, "manifest_path": manifest_path}
+    if getattr(args, "region_only", False):
+        return {"render_path": render_region(args)}
+    return {"render_path": render_job(args)}
+
+def limit_resources(args):
+    """Pins the process to its share of cores and caps its memory, as set by blenderpool workers."""
+    if args.cpu_cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, [int(core) for core in args.cpu_cores.split(",")])
+    if args.memory_mb:
+        try:
+            import resource
+        except ImportError:
+            print("Memory cap is not supported on this platform.")
+            return
+        limit = args.memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+def respond(payload):
+    sys.stdout.write(RESPONSE_PREFIX + json.dumps(payload) + "\n")
+    sys.stdout.flush()
+
+def job_namespace(defaults, job):
+    merged = dict(vars(defaults))
+    merged.update({k: v for k, v in job.items() if k != "id"})
+    return argparse.Namespace(**merged)
+
+def run_batch(defaults, jobs):
+    """Renders several jobs in this process; one failing job does not stop the rest."""
+    results = []
+    for job in jobs:
+        try:
+            results.append(dict(run_job(job_namespace(defaults, job)), ok=True))
+        except Exception as e:
+            traceback.print_exc()
+            results.append({"ok": False, "error": str(e)})
+    return results
+
+def run_jobs_file(args):
+    """Renders every spec of a JSONL job-spec file and writes <file>.results.jsonl next to it."""
+    from occlusion_jobs import read_specs, spec_to_job, results_path
+    from occlusionclient import baked_asset_paths, default_assets
+
+    # Repo models (and baked assets, if present) unless given on the command line.
+    assets = {k: v for k, v in default_assets().items() if getattr(args, k) is None}
+    if not args.base_scene and not args.asset_library:
+        base_scene, asset_library = baked_asset_paths()
+        if base_scene:
+            assets.update(base_scene=base_scene, asset_library=asset_library)
+    specs = list(read_specs(args.jobs))
+    results = run_batch(args, [spec_to_job(spec, assets) for spec in specs])
+    with open(results_path(args.jobs), "w") as f:
+        for spec, result in zip(specs, results):
+            f.write(json.dumps(dict(result, spec_id=spec["id"])) + "\n")
+    print("Rendered {}/{} job specs from: {}".format(sum(r["ok"] for r in results), len(results), args.jobs))
+    return results
+
+def serve(defaults):
+    """
+    Render jobs from stdin (one JSON object per line) until stdin closes or a 'shutdown' job arrives.
+    A {"batch": [job, ...]} line renders several jobs and answers with one result per job.
+    """
+    respond({"ready": True})
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        job_id = None
+        try:
+            job = json.loads(line)
+            job_id = job.get("id")
+            if job.get("shutdown"):
+                respond({"id": job_id, "ok": True})
+                break
+            if "batch" in job:
+                respond({"id": job_id, "ok": True, "results": run_batch(defaults, job["batch"])})
+                continue
+            result = run_job(job_namespace(defaults, job))
+            respond(dict(result, id=job_id, ok=True))
+        except Exception as e:
+            traceback.print_exc()
+            respond({"id": job_id, "ok": False, "error": str(e)})
+
+def main():
+    args = parse_args()
+    limit_resources(args)
+    if args.serve:
+        serve(args)
+    elif args.jobs:
+        run_jobs_file(args)
+    else:
+        run_job(args)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,174 @@
+import json
+import math
+import os
+import random
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+from occlusionclient import DEFAULT_LIGHT_ENERGY, MODELS_DIR, SCALE_RANGES, variant_manifest_path
+from placement import pose_matrix, silhouette, solve_pose, top_down_layer
+
+# 2.5D occlusion without Blender: the occluder's pre-rendered top-down RGBA layer and shadow pass
+# (bake_assets.py, or a cached sprite) warped to the pose and composited onto the card. Output is
+# aligned with the card pixels like occlude_render --region_only.
+# Last resort when nothing has been rendered yet: the rough silhouette filled with the texture's
+# mean colour, Lambert-shaded from a bevel height field, over a blurred, offset drop shadow.
+FALLBACK_TEXTURES = {
+    "coin": os.path.join(MODELS_DIR, "indian-coin", "textures", "COIN.png"),
+    "pen": os.path.join(MODELS_DIR, "the-pen", "textures", "Ruchka_Base_color.png"),
+    "pencil": os.path.join(MODELS_DIR, "pencil", "textures", "Pencil_albedo.jpeg"),
+}
+LIGHT_DIRECTION = np.array([-0.4, -0.5, 1.0]) / np.linalg.norm([-0.4, -0.5, 1.0])
+AMBIENT = 0.35
+BEVEL_RATIO = 0.15
+SHADOW_OPACITY = 0.55
+SHADOW_OFFSET = (0.04, 0.06)  # fraction of the occluder's on-card size
+SHADOW_BLUR = 0.06
+
+def _procedural_layers(object_type):
+    mask, ppu, ref_scale, ref_rotation = silhouette(object_type)
+    inside = (mask > 0.5).astype(np.uint8)
+    height, width = inside.shape
+    # The model textures are UV atlases, so only their average colour means anything here.
+    texture = cv2.imread(FALLBACK_TEXTURES[object_type])
+    mean = texture.reshape(-1, 3).mean(axis=0) if texture is not None else np.full(3, 160.0)
+    color = np.empty((height, width, 3), dtype=np.float32)
+    color[:] = mean
+    ys, xs = np.nonzero(inside)
+    if len(xs):
+        # Rounded rim: height rises over the outer BEVEL_RATIO of the object, flat on top.
+        bevel = max(2.0, BEVEL_RATIO * min(xs.max() + 1 - xs.min(), ys.max() + 1 - ys.min()))
+        dist = cv2.distanceTransform(inside, cv2.DIST_L2, 5)
+        relief = bevel * np.sqrt(np.minimum(dist, bevel) / bevel)
+        grad_y, grad_x = np.gradient(relief)
+        normals = np.dstack([-grad_x, -grad_y, np.ones_like(relief)])
+        normals /= np.linalg.norm(normals, axis=2, keepdims=True)
+        lambert = np.clip(normals @ LIGHT_DIRECTION, 0.0, 1.0)
+        color *= (AMBIENT + (1 - AMBIENT) * lambert)[..., None]
+
+    # A slight blur anti-aliases the edge once the silhouette is warped.
+    alpha = cv2.GaussianBlur(inside.astype(np.float32), (3, 3), 0)
+    return color, alpha, None, ppu, ref_scale, ref_rotation
+
+@lru_cache(maxsize=None)
+def object_layers(object_type):
+    """
+    BGR colour, alpha and shadow opacity (None when it has to be synthesised) in layer space,
+    plus the layer's ppu, scale and rotation. Loaded once per object type.
+    """
+    layer = top_down_layer(object_type)
+    if layer is not None:
+        sprite = cv2.imread(layer["sprite_path"], cv2.IMREAD_UNCHANGED)
+        shadow = cv2.imread(layer["shadow_path"], cv2.IMREAD_UNCHANGED)
+        if all(img is not None and img.ndim == 3 and img.shape[2] == 4 for img in (sprite, shadow)):
+            return (sprite[..., :3].astype(np.float32), sprite[..., 3].astype(np.float32) / 255.0,
+                    shadow[..., 3].astype(np.float32) / 255.0, layer["ppu"], layer["scale"], layer["rotation"])
+    print(f"Warning: no rendered top-down layer for '{object_type}'; drawing a procedural stand-in. "
+          "Run bake_assets.py in Blender to bake one.")
+    return _procedural_layers(object_type)
+
+def composite_occluder(card, object_type, pose, center, light_energy=None):
+    """Draws one occluder with its drop shadow into a BGR uint8 card in place."""
+    color, alpha, shadow_layer, ppu, ref_scale, ref_rotation = object_layers(object_type)
+    img_h, img_w = card.shape[:2]
+    sil_h, sil_w = alpha.shape
+    matrix = pose_matrix((sil_w, sil_h), ppu, ref_scale, ref_rotation, pose, center, img_w, img_h, aligned=True)
+
+    corners = matrix @ np.array([[0, sil_w, 0, sil_w], [0, 0, sil_h, sil_h], [1, 1, 1, 1]], dtype=np.float64)
+    size = max(corners[0].max() - corners[0].min(), corners[1].max() - corners[1].min())
+    shift = np.array(SHADOW_OFFSET) * size
+    sigma = max(1.0, SHADOW_BLUR * size)
+    margin = 3 * sigma + np.abs(shift).max()
+    x0 = max(0, int(math.floor(corners[0].min() - margin)))
+    y0 = max(0, int(math.floor(corners[1].min() - margin)))
+    x1 = min(img_w, int(math.ceil(corners[0].max() + margin)))
+    y1 = min(img_h, int(math.ceil(corners[1].max() + margin)))
+    if x0 >= x1 or y0 >= y1:
+        return card
+
+    # Only the occluder's neighbourhood is warped and blended.
+    local = matrix.copy()
+    local[:, 2] -= (x0, y0)
+    roi_size = (x1 - x0, y1 - y0)
+    a = cv2.warpAffine(alpha, local, roi_size, flags=cv2.INTER_LINEAR)[..., None]
+    c = cv2.warpAffine(color, local, roi_size, flags=cv2.INTER_LINEAR)
+    if shadow_layer is not None:
+        # Rendered shadow pass: same frame as the colour layer, already soft and offset by the light.
+        shadow = cv2.warpAffine(shadow_layer, local, roi_size, flags=cv2.INTER_LINEAR)
+    else:
+        shadow_matrix = local.copy()
+        shadow_matrix[:, 2] += shift
+        shadow = cv2.warpAffine(alpha, shadow_matrix, roi_size, flags=cv2.INTER_LINEAR)
+        shadow = cv2.GaussianBlur(shadow, (0, 0), sigma) * SHADOW_OPACITY
+
+    light = (light_energy or DEFAULT_LIGHT_ENERGY) / DEFAULT_LIGHT_ENERGY
+    region = card[y0:y1, x0:x1].astype(np.float32)
+    region *= (1.0 - shadow)[..., None]
+    region = region * (1.0 - a) + np.clip(c * light, 0, 255) * a
+    card[y0:y1, x0:x1] = np.clip(region + 0.5, 0, 255).astype(np.uint8)
+    return card
+
+def random_pose(object_type, rng=random):
+    return {"offset": [0.0, 0.0], "rotation": rng.uniform(0, 360), "scale": rng.uniform(*SCALE_RANGES[object_type])}
+
+def run_fallback_occlusion(
+    img_path,
+    render_path,
+    object_type,
+    field,
+    field_bbox,
+    img_width=None,
+    img_height=None,
+    variants=None,
+    coverage_range=None,
+    pose=None,
+    **blender_options,
+):
+    """
+    Same interface as main.run_blender_occlusion (Blender-only options such as the executable,
+    model paths or render profile are accepted and ignored). Returns render_path, or the list of
+    variant paths when variants is given.
+    """
+    card = cv2.imread(img_path)
+    if card is None:
+        raise FileNotFoundError(f"Image not found at {img_path}")
+    img_height, img_width = card.shape[:2]
+    if field_bbox is None:
+        from fieldmap import extract_fields
+        field_bbox = extract_fields(img_path).bbox(field)
+        if field_bbox is None:
+            raise ValueError(f"Could not find bounding box for field '{field}'.")
+    x1, y1, x2, y2 = field_bbox
+    center = ((x1 + x2) / 2, (y1 + y2) / 2)
+
+    if variants:
+        if isinstance(variants, int):
+            variants = [dict(random_pose(object_type), object_type=object_type) for _ in range(variants)]
+        root = os.path.splitext(render_path)[0]
+        entries = []
+        for frame, variant in enumerate(variants, start=1):
+            variant_type = variant.get("object_type") or object_type
+            variant_pose = dict(random_pose(variant_type), **{k: v for k, v in variant.items() if v is not None})
+            out = card.copy()
+            composite_occluder(out, variant_type, variant_pose, center, variant_pose.get("light_energy"))
+            path = f"{root}_{frame:04d}.png"
+            cv2.imwrite(path, out)
+            entries.append(dict(variant_pose, object_type=variant_type, frame=frame, render_path=path))
+        with open(variant_manifest_path(render_path), "w") as f:
+            json.dump({"img_path": img_path, "field": field, "field_bbox": list(field_bbox), "variants": entries},
+                      f, indent=2)
+        return [entry["render_path"] for entry in entries]
+
+    if pose is None and coverage_range:
+        from fieldmap import extract_fields
+        fields = {name: list(result.bbox) for name, result in extract_fields(img_path).items()}
+        fields[field] = list(field_bbox)
+        pose = solve_pose(object_type, fields, field, img_width, img_height, coverage_range, aligned=True)
+        if pose is None:
+            raise ValueError(f"No {object_type} pose covers {coverage_range} of '{field}'.")
+    pose = dict(random_pose(object_type), **(pose or {}))
+    composite_occluder(card, object_type, pose, center, pose.get("light_energy"))
+    cv2.imwrite(render_path, card)
+    return render_path
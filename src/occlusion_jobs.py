@@ -0,0 +1,249 @@
+import argparse
+import json
+import os
+import random
+import time
+
+from occlusionclient import OBJECT_TYPES, SCALE_RANGES, baked_asset_paths, default_assets, find_blender
+
+# One occlusion render per JSONL line:
+# {"version": 1, "id": ..., "card": path, "width": W, "height": H,
+#  "fields": {"name": [x1, y1, x2, y2], ...}, "field": "dob", "object_type": "coin",
+#  "pose": {"offset": [dx, dy], "rotation": deg, "scale": s, "light_energy": e, "coverage": optional},
+#  "output": path, "profile": optional, "region_only": optional, "sprite": optional}
+# "sprite" specs are composited from the sprite cache (sprites.py) instead of rendered in full.
+# Field boxes come from one OCR (or sidecar) pass per card and are reused by every spec of that card.
+# Only the standard library is imported at module level so occlude_render can read specs inside Blender.
+JOB_SPEC_VERSION = 1
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+DEFAULT_FIELDS = ("aadhar_number", "dob")
+
+def results_path(spec_path):
+    return os.path.splitext(spec_path)[0] + ".results.jsonl"
+
+def random_pose(object_type, field_bbox, rng=random):
+    x1, y1, x2, y2 = field_bbox
+    return {
+        "offset": [rng.uniform(-(x2 - x1) / 4, (x2 - x1) / 4), rng.uniform(-(y2 - y1) / 4, (y2 - y1) / 4)],
+        "rotation": rng.uniform(0, 360),
+        "scale": rng.uniform(*SCALE_RANGES[object_type]),
+        "light_energy": rng.uniform(250, 450),
+    }
+
+def make_spec(spec_id, card, width, height, fields, field, object_type, output, pose=None, profile=None,
+              region_only=False, sprite=False):
+    if field not in fields:
+        raise ValueError(f"Field '{field}' has no bounding box for {card}.")
+    if object_type not in OBJECT_TYPES:
+        raise ValueError(f"Unknown object_type '{object_type}'.")
+    spec = {
+        "version": JOB_SPEC_VERSION,
+        "id": spec_id,
+        "card": os.path.abspath(card),
+        "width": int(width),
+        "height": int(height),
+        "fields": {name: [float(v) for v in bbox] for name, bbox in fields.items()},
+        "field": field,
+        "object_type": object_type,
+        "pose": pose or {},
+        "output": os.path.abspath(output),
+    }
+    if profile:
+        spec["profile"] = profile
+    if region_only:
+        spec["region_only"] = True
+    if sprite:
+        spec["sprite"] = True
+    return spec
+
+def card_fields(image_path):
+    """All field boxes of a card from a single sidecar/OCR pass, plus its size."""
+    from fieldmap import extract_fields
+    fields = extract_fields(image_path)
+    return {name: list(result.bbox) for name, result in fields.items()}, fields.width, fields.height
+
+def build_specs(input_dir, output_dir, fields=DEFAULT_FIELDS, object_types=OBJECT_TYPES, per_field=1,
+                profile=None, region_only=False, seed=None, coverage_range=None, max_other=0.2, sprite=False):
+    """
+    Yields specs for every card in input_dir: per_field poses for each requested field.
+    With coverage_range (e.g. (0.4, 0.7)) poses come from placement.solve_pose, so only poses
+    that hide that share of the field (and at most max_other of any other field) get rendered.
+    """
+    rng = random.Random(seed)
+    os.makedirs(output_dir, exist_ok=True)
+    for filename in sorted(os.listdir(input_dir)):
+        if not filename.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        card = os.path.join(input_dir, filename)
+        boxes, width, height = card_fields(card)
+        stem = os.path.splitext(filename)[0]
+        for field in fields:
+            if field not in boxes:
+                print(f"Skipping {field} on {filename}: field not found.")
+                continue
+            for n in range(per_field):
+                object_type = rng.choice(list(object_types))
+                if coverage_range:
+                    from placement import solve_pose
+                    # Region renders and sprites are pasted onto the card itself, with square pixels.
+                    pose = solve_pose(object_type, boxes, field, width, height, coverage_range, max_other,
+                                      aligned=region_only or sprite, sprite_grid=sprite, rng=rng)
+                    if pose is None:
+                        print(f"No {object_type} pose on {filename} covers {coverage_range} of {field}; skipped.")
+                        continue
+                    pose["light_energy"] = rng.uniform(250, 450)
+                else:
+                    pose = random_pose(object_type, boxes[field], rng)
+                spec_id = f"{stem}-{field}-{object_type}-{n}"
+                yield make_spec(spec_id, card, width, height, boxes, field, object_type,
+                                os.path.join(output_dir, f"{spec_id}.png"), pose=pose,
+                                profile=profile, region_only=region_only, sprite=sprite)
+
+def write_specs(specs, spec_path, append=False):
+    count = 0
+    with open(spec_path, "a" if append else "w") as f:
+        for spec in specs:
+            f.write(json.dumps(spec) + "\n")
+            count += 1
+    return count
+
+def read_specs(spec_path):
+    with open(spec_path) as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            spec = json.loads(line)
+            if spec.get("version") != JOB_SPEC_VERSION:
+                raise ValueError(f"{spec_path}:{line_no}: unsupported job spec version {spec.get('version')}")
+            yield spec
+
+def spec_to_job(spec, assets=None):
+    """occlude_render job arguments for a spec; assets adds model/texture (and baked scene) paths."""
+    pose = spec.get("pose", {})
+    job = dict(assets or {})
+    job.update({
+        "img_path": spec["card"],
+        "object_type": spec["object_type"],
+        "field": spec["field"],
+        "render_path": spec["output"],
+        "field_bbox": spec["fields"][spec["field"]],
+        "img_width": spec["width"],
+        "img_height": spec["height"],
+    })
+    for key in ("offset", "rotation", "scale", "light_energy"):
+        if pose.get(key) is not None:
+            job[key] = pose[key]
+    for key in ("profile", "region_only"):
+        if spec.get(key):
+            job[key] = spec[key]
+    return job
+
+def run_specs_2d(spec_path):
+    """Renders every spec with the Blender-free 2.5D renderer. Writes <spec>.results.jsonl; returns (ok, failed)."""
+    from occlusion_fallback import run_fallback_occlusion
+
+    ok = failed = 0
+    start = time.time()
+    with open(results_path(spec_path), "w") as f:
+        for spec in read_specs(spec_path):
+            pose = {k: v for k, v in spec.get("pose", {}).items() if k != "coverage"}
+            try:
+                run_fallback_occlusion(spec["card"], spec["output"], spec["object_type"], spec["field"],
+                                       spec["fields"][spec["field"]], spec["width"], spec["height"], pose=pose)
+                result = {"ok": True, "render_path": spec["output"]}
+                ok += 1
+            except Exception as e:
+                result = {"ok": False, "error": str(e)}
+                failed += 1
+            f.write(json.dumps(dict(result, spec_id=spec["id"])) + "\n")
+    rate = (ok + failed) / max(time.time() - start, 1e-6)
+    print(f"Rendered {ok + failed} occlusions without Blender ({failed} failed, {rate:.1f}/s)")
+    return ok, failed
+
+def run_specs(spec_path, blender_executable, occlusion_script, assets=None, batch_size=16, workers=None):
+    """
+    Renders every spec on the Blender worker pool, batch_size specs per request so each
+    worker renders many cards per round trip. Writes <spec>.results.jsonl; returns (ok, failed).
+    Without a Blender executable the specs go to the 2.5D fallback renderer instead.
+    """
+    if not blender_executable:
+        return run_specs_2d(spec_path)
+    from blenderpool import get_blender_pool
+    from sprites import occlude_with_sprite
+
+    assets = dict(default_assets() if assets is None else assets)
+    base_scene, asset_library = baked_asset_paths()
+    if base_scene:
+        assets.update(base_scene=base_scene, asset_library=asset_library)
+
+    all_specs = list(read_specs(spec_path))
+    specs = [spec for spec in all_specs if not spec.get("sprite")]
+    pool = get_blender_pool(blender_executable, occlusion_script, workers=workers)
+    batches = [specs[i:i + batch_size] for i in range(0, len(specs), batch_size)]
+    futures = [pool.submit({"batch": [spec_to_job(spec, assets) for spec in batch]}) for batch in batches]
+
+    ok = failed = 0
+    start = time.time()
+    with open(results_path(spec_path), "w") as f:
+        # Sprite specs only need Blender for poses that aren't cached yet.
+        for spec in (spec for spec in all_specs if spec.get("sprite")):
+            pose = {k: v for k, v in spec.get("pose", {}).items() if k != "coverage"}
+            try:
+                occlude_with_sprite(spec["card"], spec["output"], spec["object_type"], spec["fields"][spec["field"]],
+                                    blender_executable, occlusion_script, assets, spec.get("profile") or "balanced",
+                                    pose=pose)
+                result = {"ok": True, "render_path": spec["output"]}
+                ok += 1
+            except Exception as e:
+                result = {"ok": False, "error": str(e)}
+                failed += 1
+            f.write(json.dumps(dict(result, spec_id=spec["id"])) + "\n")
+        for batch, future in zip(batches, futures):
+            try:
+                results = future.result()["results"]
+            except Exception as e:
+                results = [{"ok": False, "error": str(e)}] * len(batch)
+            for spec, result in zip(batch, results):
+                f.write(json.dumps(dict(result, spec_id=spec["id"])) + "\n")
+                ok += bool(result.get("ok"))
+                failed += not result.get("ok")
+            rate = (ok + failed) / max(time.time() - start, 1e-6)
+            print(f"Rendered {ok + failed}/{len(all_specs)} occlusions ({failed} failed, {rate:.2f}/s)")
+    return ok, failed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and render occlusion job specs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Write job specs for every card in a folder")
+    build.add_argument("--input_dir", required=True)
+    build.add_argument("--output_dir", required=True, help="Where renders will be written")
+    build.add_argument("--specs", default="occlusion_jobs.jsonl")
+    build.add_argument("--fields", nargs="+", default=list(DEFAULT_FIELDS))
+    build.add_argument("--objects", nargs="+", default=OBJECT_TYPES, choices=OBJECT_TYPES)
+    build.add_argument("--per_field", type=int, default=1)
+    build.add_argument("--profile")
+    build.add_argument("--region_only", action="store_true")
+    build.add_argument("--sprite", action="store_true", help="Composite cached sprites instead of full renders")
+    build.add_argument("--seed", type=int)
+    build.add_argument("--coverage", nargs=2, type=float, metavar=("MIN", "MAX"),
+                       help="Only keep poses hiding this fraction of the field, e.g. 0.4 0.7")
+    build.add_argument("--max_other", type=float, default=0.2, help="Largest fraction of any other field to hide")
+
+    run = commands.add_parser("run", help="Render a job-spec file on the Blender worker pool")
+    run.add_argument("--specs", default="occlusion_jobs.jsonl")
+    run.add_argument("--blender", default=find_blender(), help="Defaults to BLENDER_EXECUTABLE or PATH; "
+                     "without Blender the 2.5D fallback renderer is used")
+    run.add_argument("--script", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "occlude_render.py"))
+    run.add_argument("--batch_size", type=int, default=16)
+    run.add_argument("--workers", type=int)
+
+    args = parser.parse_args()
+    if args.command == "build":
+        count = write_specs(build_specs(args.input_dir, args.output_dir, args.fields, args.objects, args.per_field,
+                                        args.profile, args.region_only, args.seed, args.coverage,
+                                        args.max_other, args.sprite), args.specs)
+        print(f"Wrote {count} job specs to {args.specs}")
+    else:
+        run_specs(args.specs, args.blender, args.script, batch_size=args.batch_size, workers=args.workers)
@@ -0,0 +1,197 @@
+import atexit
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import threading
+
+# Shared with occlude_render, which imports them inside Blender; this module stays stdlib-only.
+# Server responses are prefixed so they can be told apart from Blender's own log output.
+RESPONSE_PREFIX = "@@HYPERGEN@@ "
+
+# Named quality/speed trade-offs. CPU is the default device; pass --device GPU on GPU nodes.
+# "fast" and "balanced" lean on adaptive sampling and OpenImageDenoise to cut samples;
+# "final" matches the original 256-sample, undenoised render.
+# Measure them on your own hardware with --benchmark.
+RENDER_PROFILES = {
+    "fast": {"engine": "CYCLES", "samples": 16, "adaptive_threshold": 0.1, "denoise": True,
+             "max_bounces": 2, "tile_size": 512, "persistent_data": True},
+    "balanced": {"engine": "CYCLES", "samples": 64, "adaptive_threshold": 0.03, "denoise": True,
+                 "max_bounces": 4, "tile_size": 512, "persistent_data": True},
+    "final": {"engine": "CYCLES", "samples": 256, "adaptive_threshold": 0.01, "denoise": False,
+              "max_bounces": 12, "tile_size": 2048, "persistent_data": True},
+    "eevee": {"engine": "EEVEE", "samples": 16, "persistent_data": True},
+}
+DEFAULT_PROFILE = "final"
+BENCHMARK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp", "render_profiles.json")
+
+def load_profile_benchmarks(path=BENCHMARK_PATH):
+    """Per-profile results from `occlude_render.py --benchmark`, or {} if it has not been run here."""
+    try:
+        with open(path) as f:
+            return json.load(f).get("profiles", {})
+    except (OSError, ValueError):
+        return {}
+
+def profile_summary(path=BENCHMARK_PATH):
+    benchmarks = load_profile_benchmarks(path)
+    parts = []
+    for name in RENDER_PROFILES:
+        result = benchmarks.get(name)
+        if result and "seconds" in result:
+            parts.append(f"{name}: {result['seconds']}s, {result['psnr_vs_final']} dB")
+    if not parts:
+        return "Run occlude_render.py --benchmark to measure render time and PSNR per profile."
+    return "Measured (PSNR vs final): " + "; ".join(parts)
+
+OBJECT_TYPES = ["coin", "pen", "pencil"]
+SCALE_RANGES = {"coin": (0.10, 0.25), "pen": (0.4, 0.6), "pencil": (0.4, 0.6)}
+DEFAULT_LIGHT_ENERGY = 350
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "3d-models")
+BAKED_DIR = os.path.join(MODELS_DIR, "baked")
+
+def find_blender():
+    """Blender from BLENDER_EXECUTABLE or PATH; None when this host has no Blender."""
+    path = os.environ.get("BLENDER_EXECUTABLE") or shutil.which("blender")
+    return path if path and os.path.exists(path) else None
+
+def default_assets(models_dir=MODELS_DIR):
+    """Occluder model and texture paths in the repo's 3d-models folder, keyed like occlude_render's arguments."""
+    return {
+        "coin_model": os.path.join(models_dir, "indian-coin", "source", "COIN.fbx"),
+        "coin_texture": os.path.join(models_dir, "indian-coin", "textures", "COIN.png"),
+        "pen_model": os.path.join(models_dir, "the-pen", "source", "Pen_Low.fbx"),
+        "pen_texture": os.path.join(models_dir, "the-pen", "textures", "Ruchka_Normal_DirectX.png"),
+        "pencil_model": os.path.join(models_dir, "pencil", "source", "Pencil.fbx"),
+        "pencil_texture": os.path.join(models_dir, "pencil", "textures", "Pencil_normal.png"),
+    }
+
+def variant_manifest_path(render_path):
+    """Manifest written by an occlude_render variant job; must match occlude_render.variant_output_paths."""
+    return os.path.splitext(render_path)[0] + "_variants.json"
+
+def read_variant_manifest(render_path):
+    with open(variant_manifest_path(render_path)) as f:
+        return json.load(f)
+
+# bake_assets.py also renders each occluder top-down (rotation 0, largest scale of its range)
+# into an RGBA layer and a shadow pass; the placement solver and the 2.5D renderer use them.
+TOP_DOWN_PPU = 400
+
+def top_down_layers(baked_dir=BAKED_DIR):
+    """object_type -> {sprite_path, shadow_path, ppu, scale, rotation} from bake_assets.py, or {} if not baked."""
+    try:
+        with open(os.path.join(baked_dir, "layers.json")) as f:
+            layers = json.load(f).get("layers", {})
+    except (OSError, ValueError):
+        return {}
+    found = {}
+    for object_type, entry in layers.items():
+        entry = dict(entry, sprite_path=os.path.join(baked_dir, entry["sprite_path"]),
+                     shadow_path=os.path.join(baked_dir, entry["shadow_path"]))
+        if os.path.exists(entry["sprite_path"]) and os.path.exists(entry["shadow_path"]):
+            found[object_type] = entry
+    return found
+
+def baked_asset_paths(baked_dir=BAKED_DIR):
+    """(base_scene, asset_library) written by bake_assets.py, or (None, None) if not baked yet."""
+    base_scene = os.path.join(baked_dir, "base_scene.blend")
+    asset_library = os.path.join(baked_dir, "occluders.blend")
+    if os.path.exists(base_scene) and os.path.exists(asset_library):
+        return base_scene, asset_library
+    return None, None
+
+class BlenderRenderServer:
+    """
+    Client for `occlude_render.py --serve`: one Blender process stays alive and renders
+    jobs sent as JSON lines over stdin, so startup and module loading are paid once.
+    """
+
+    def __init__(self, blender_executable, occlusion_script, blender_args=(), script_args=(), env=None):
+        self.blender_executable = blender_executable
+        self.occlusion_script = occlusion_script
+        self.blender_args = list(blender_args)
+        self.script_args = list(script_args)
+        self.env = env
+        self.process = None
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _command(self):
+        return [self.blender_executable, "--background", *self.blender_args,
+                "--python", self.occlusion_script, "--", "--serve", *self.script_args]
+
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        self.process = subprocess.Popen(
+            self._command(),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+            env=self.env,
+        )
+        ready = self._read_response()
+        if not ready.get("ready"):
+            raise RuntimeError("Blender render server did not start correctly.")
+
+    def _read_response(self):
+        for line in self.process.stdout:
+            if line.startswith(RESPONSE_PREFIX):
+                return json.loads(line[len(RESPONSE_PREFIX):])
+            # Anything else is Blender's own logging; pass it through.
+            print(line, end="")
+        code = self.process.wait()
+        self.process = None
+        raise RuntimeError(f"Blender render server exited with code {code}.")
+
+    def render(self, job):
+        """Sends one job (occlude_render arguments as a dict) and waits for its result."""
+        with self._lock:
+            if not self.alive():
+                self.start()
+            job = dict(job, id=next(self._ids))
+            try:
+                self.process.stdin.write(json.dumps(job) + "\n")
+                self.process.stdin.flush()
+            except (BrokenPipeError, OSError):
+                self.process = None
+                raise RuntimeError("Blender render server is not accepting jobs.")
+            response = self._read_response()
+        if not response.get("ok"):
+            raise RuntimeError(f"Blender render failed: {response.get('error')}")
+        return response
+
+    def close(self):
+        with self._lock:
+            if not self.alive():
+                return
+            try:
+                self.process.stdin.write(json.dumps({"shutdown": True}) + "\n")
+                self.process.stdin.flush()
+                self.process.stdin.close()
+                self.process.wait(timeout=10)
+            except Exception:
+                self.process.kill()
+            self.process = None
+
+_servers = {}
+_servers_lock = threading.Lock()
+
+def get_render_server(blender_executable, occlusion_script):
+    key = (blender_executable, occlusion_script)
+    with _servers_lock:
+        server = _servers.get(key)
+        if server is None:
+            server = BlenderRenderServer(blender_executable, occlusion_script)
+            _servers[key] = server
+    return server
+
+@atexit.register
+def _shutdown_servers():
+    for server in list(_servers.values()):
+        server.close()
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+import cv2
+import numpy as np
+
+# OCR results are keyed by the decoded pixels plus backend and parameters, so the
+# same card is only recognised once no matter which stage (or run) asks for it.
+CACHE_VERSION = 1
+MAX_CACHE_BYTES = int(os.environ.get("HYPERGEN_OCR_CACHE_MB", "256")) * 1024 * 1024
+# The cache size is tracked as entries are written; the directory is only rescanned to
+# evict, or every RESCAN_PUTS writes to pick up entries other processes added.
+RESCAN_PUTS = 256
+
+_size_lock = threading.Lock()
+_size = {"bytes": None, "puts": 0}
+
+def ensure_cache_dir():
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp", "ocr_cache")
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+def load_pixels(image):
+    if isinstance(image, np.ndarray):
+        return image
+    pixels = cv2.imread(image, cv2.IMREAD_UNCHANGED)
+    if pixels is None:
+        raise FileNotFoundError(f"Image not found at {image}")
+    return pixels
+
+def cache_key(pixels, backend, params):
+    digest = hashlib.sha256()
+    digest.update(f"v{CACHE_VERSION}|{backend}|{json.dumps(params, sort_keys=True)}|".encode())
+    digest.update(f"{pixels.shape}|{pixels.dtype}|".encode())
+    digest.update(np.ascontiguousarray(pixels).data)
+    return digest.hexdigest()
+
+def _entry_path(key):
+    return os.path.join(ensure_cache_dir(), f"{key}.json")
+
+def cache_get(key):
+    path = _entry_path(key)
+    try:
+        with open(path) as f:
+            payload = json.load(f)
+        # Touch the entry so eviction drops the least recently used results first.
+        os.utime(path)
+        return payload
+    except (OSError, ValueError):
+        return None
+
+def cache_put(key, payload):
+    cache_dir = ensure_cache_dir()
+    path = _entry_path(key)
+    try:
+        replaced = os.path.getsize(path)
+    except OSError:
+        replaced = 0
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(payload, f)
+        written = os.path.getsize(tmp_path)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    with _size_lock:
+        _size["puts"] += 1
+        if _size["bytes"] is not None and _size["puts"] % RESCAN_PUTS:
+            _size["bytes"] += written - replaced
+            if _size["bytes"] <= MAX_CACHE_BYTES:
+                return
+        _size["bytes"] = evict(MAX_CACHE_BYTES)
+
+def evict(max_bytes):
+    """Drops least recently used entries until the cache fits; returns the remaining size in bytes."""
+    entries = []
+    total = 0
+    for entry in os.scandir(ensure_cache_dir()):
+        if not entry.name.endswith(".json"):
+            continue
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total += stat.st_size
+    if total <= max_bytes:
+        return total
+    entries.sort()
+    for _, size, path in entries:
+        try:
+            os.unlink(path)
+        except OSError:
+            continue
+        total -= size
+        if total <= max_bytes * 0.9:
+            break
+    return total
+
+def _to_number(value):
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+def cached_readtext(image, langs=("en",), gpu=False, **kwargs):
+    """
+    EasyOCR readtext through the result cache.
+    Accepts an image path or a decoded array and returns [(bbox, text, prob), ...].
+    """
+    pixels = load_pixels(image)
+    key = cache_key(pixels, "easyocr", {"langs": list(langs), **kwargs})
+    payload = cache_get(key)
+    if payload is not None:
+        return [(bbox, text, prob) for bbox, text, prob in payload]
+
+    from ocrpool import borrow_reader
+    with borrow_reader(langs, gpu=gpu) as reader:
+        results = reader.readtext(image, **kwargs)
+
+    payload = [
+        [[[_to_number(v) for v in point] for point in bbox], text, float(prob)]
+        for bbox, text, prob in results
+    ]
+    cache_put(key, payload)
+    return [(bbox, text, prob) for bbox, text, prob in payload]
+
+def cached_image_to_data(image, lang=None, config=""):
+    """pytesseract.image_to_data (Output.DICT) through the result cache."""
+    import pytesseract
+    from pytesseract import Output
+
+    pixels = load_pixels(image)
+    key = cache_key(pixels, "tesseract", {"lang": lang, "config": config})
+    payload = cache_get(key)
+    if payload is not None:
+        return payload
+
+    data = pytesseract.image_to_data(pixels, lang=lang, config=config, output_type=Output.DICT)
+    payload = {k: [_to_number(v) if isinstance(v, (int, float, np.number)) else v for v in values]
+               for k, values in data.items()}
+    cache_put(key, payload)
+    return payload
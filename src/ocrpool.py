@@ -0,0 +1,87 @@
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+import easyocr
+
+# Readers are expensive (CRAFT + recognizer weights), so every stage borrows from
+# a small per-process pool instead of constructing its own easyocr.Reader.
+POOL_SIZE = int(os.environ.get("HYPERGEN_OCR_POOL_SIZE", "1"))
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+class ReaderPool:
+    def __init__(self, langs=("en",), gpu=False, size=POOL_SIZE):
+        self.langs = list(langs)
+        self.gpu = gpu
+        self.size = max(1, size)
+        self._idle = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _new_reader(self):
+        print(f"Loading EasyOCR reader ({', '.join(self.langs)}, gpu={self.gpu})")
+        return easyocr.Reader(self.langs, gpu=self.gpu)
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = self._created < self.size
+            if create:
+                self._created += 1
+        if create:
+            try:
+                return self._new_reader()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        return self._idle.get()
+
+    def release(self, reader):
+        self._idle.put(reader)
+
+    def warm_up(self, count=1):
+        readers = [self.acquire() for _ in range(min(count, self.size))]
+        for reader in readers:
+            self.release(reader)
+
+def get_pool(langs=("en",), gpu=False):
+    key = (tuple(langs), gpu)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ReaderPool(langs, gpu)
+            _pools[key] = pool
+    return pool
+
+@contextmanager
+def borrow_reader(langs=("en",), gpu=False):
+    pool = get_pool(langs, gpu)
+    reader = pool.acquire()
+    try:
+        yield reader
+    finally:
+        pool.release(reader)
+
+def warm_up_in_background(langs=("en",), gpu=False, count=1):
+    """Starts loading readers on a daemon thread so the first request doesn't pay for it."""
+    def _warm():
+        try:
+            get_pool(langs, gpu).warm_up(count)
+            print("EasyOCR reader pool is warm.")
+        except Exception as e:
+            print(f"EasyOCR warm-up failed: {e}")
+
+    thread = threading.Thread(target=_warm, name="ocr-warmup", daemon=True)
+    thread.start()
+    return thread
+
+def init_worker(langs=("en",), gpu=False):
+    """Pool initializer for process workers: each process loads its reader once up front."""
+    get_pool(langs, gpu).warm_up()
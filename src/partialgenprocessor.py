@@ -1,10 +1,10 @@
-import easyocr
 import cv2
 from PIL import Image, ImageFilter
 import numpy as np
 import os
-import re
 from enum import Enum
+from fieldmap import detect_name_field, detect_aadhar_number, extract_fields
+from sidecar import crop_fields, fieldmap_entries, write_sidecar
 
 def ensure_temp_dir():
     temp_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp")
@@ -26,61 +26,6 @@ def load_image(image_path):
     print(f"Image loaded: {image_path}, Dimensions: {image_width}x{image_height}")
     return image_cv, image_height, image_width
 
-def initialize_ocr():
-    return easyocr.Reader(['en'], gpu=False)
-
-def detect_name_field(results, image_height):
-    """Detect name field in OCR results"""
-    name_bbox = None
-    name_text = None
-    
-    for (bbox, text, prob) in results:
-        y_top = bbox[0][1]
-        
-        is_proper_name = (
-            text.replace(" ", "").isalpha() and
-            len(text.split()) >= 1 and  
-            prob > 0.5 and  
-            y_top < image_height * 0.7 and  
-            "government of india" not in text.lower() and
-            len(text) > 3 
-        )
-        
-        if is_proper_name:
-            name_bbox = bbox
-            name_text = text
-            print(f"Name Field Detected: {text}")
-            break
-    
-    if name_bbox is None:
-        results_sorted = sorted(results, key=lambda x: x[0][0][1])
-        for (bbox, text, prob) in results_sorted[:5]:
-            if len(text) > 3 and prob > 0.4:
-                name_bbox = bbox
-                name_text = text
-                print(f"Name Field (relaxed): {text}")
-                break
-    
-    return name_bbox, name_text
-
-
-def detect_aadhar_number(results):
-    aadhar_bbox = None
-    aadhar_text = None
-    
-    for (bbox, text, prob) in results:
-        aadhar_pattern = r'\d{4}\s*\d{4}\s*\d{4}'
-        matches = re.findall(aadhar_pattern, text)
-        
-        if matches or (len(text.replace(" ", "")) >= 10 and text.replace(" ", "").isdigit()):
-            aadhar_bbox = bbox
-            aadhar_text = text
-            print(f"Aadhaar Number detected: {text}")
-            break
-    
-    return aadhar_bbox, aadhar_text
-
-
 def normalize_bbox(bbox):
     if isinstance(bbox[0], list):
         x_coords = [point[0] for point in bbox]
@@ -104,9 +49,9 @@ def expand_bbox(bbox, image_width, image_height, margin_ratio=0.08):
     return [x1, y1, x2, y2]
 
 
-def create_partial_id_with_options(image_cv, name_bbox, aadhar_bbox, redaction_option, output_path, apply_blur_effect=False):
+def create_partial_id_with_options(image_cv, name_bbox, aadhar_bbox, redaction_option, output_path, apply_blur_effect=False, fields=None):
     image_height, image_width = image_cv.shape[:2]
-    cropped_image = None
+    crop_range = None
     
     if redaction_option == RedactionOption.NAME_ONLY:
         if name_bbox is not None:
@@ -115,10 +60,10 @@ def create_partial_id_with_options(image_cv, name_bbox, aadhar_bbox, redaction_o
             
             crop_y_start = expanded_bbox[3] + 1
             if crop_y_start < image_height:
-                cropped_image = image_cv[crop_y_start:image_height, 0:image_width]
+                crop_range = (crop_y_start, image_height)
             else:
                 crop_y_end = expanded_bbox[1] - 1
-                cropped_image = image_cv[0:max(crop_y_end, image_height//3), 0:image_width]
+                crop_range = (0, max(crop_y_end, image_height//3))
     
     elif redaction_option == RedactionOption.AADHAR_ONLY:
         if aadhar_bbox is not None:
@@ -127,12 +72,17 @@ def create_partial_id_with_options(image_cv, name_bbox, aadhar_bbox, redaction_o
             
             crop_y_end = expanded_bbox[1] -1
             if crop_y_end > 0:
-                cropped_image = image_cv[0:crop_y_end, 0:image_width]
+                crop_range = (0, crop_y_end)
             else:
                 crop_y_start = expanded_bbox[3] + 1
-                cropped_image = image_cv[crop_y_start:image_height, 0:image_width]
-    
-    result_img = cropped_image if cropped_image is not None else image_cv
+                crop_range = (crop_y_start, image_height)
+
+    if crop_range is not None:
+        crop_y_start, crop_y_end = crop_range[0], min(crop_range[1], image_height)
+        result_img = image_cv[crop_y_start:crop_y_end, 0:image_width]
+    else:
+        crop_y_start, crop_y_end = 0, image_height
+        result_img = image_cv
 
     if apply_blur_effect:
         pil_image = Image.fromarray(cv2.cvtColor(result_img, cv2.COLOR_BGR2RGB))
@@ -147,16 +97,19 @@ def create_partial_id_with_options(image_cv, name_bbox, aadhar_bbox, redaction_o
 
     cv2.imwrite(output_path, result_img)
     print(f"Processed image saved to: {output_path}")
+
+    if fields is not None:
+        # Carry the known field boxes over to the cropped card so later stages skip OCR too.
+        entries = crop_fields(fieldmap_entries(fields), crop_y_start, crop_y_end, image_width)
+        write_sidecar(output_path, entries, result_img.shape[1], result_img.shape[0], source=fields.source)
     return output_path
 
 def create_partial_id(image_path, redaction_option=None, apply_blur_effect=False, output_path=None):
     try:
         image_cv, image_height, image_width = load_image(image_path)
-        reader = initialize_ocr()
-        
-        results = reader.readtext(image_path)
-        name_bbox, name_text = detect_name_field(results, image_height)
-        aadhar_bbox, aadhar_text = detect_aadhar_number(results)
+        fields = extract_fields(image_path)
+        name_bbox, name_text = fields.bbox("name"), fields.text("name")
+        aadhar_bbox, aadhar_text = fields.bbox("aadhar_number"), fields.text("aadhar_number")
         
         print(f"Name detected: {'Yes' if name_bbox else 'No'} - {name_text if name_text else 'N/A'}")
         print(f"Aadhaar detected: {'Yes' if aadhar_bbox else 'No'} - {aadhar_text if aadhar_text else 'N/A'}")
@@ -168,7 +121,7 @@ def create_partial_id(image_path, redaction_option=None, apply_blur_effect=False
         elif not os.path.isabs(output_path):
             output_path = os.path.join(temp_dir, output_path)
             
-        result_path = create_partial_id_with_options(image_cv, name_bbox, aadhar_bbox, redaction_option, output_path, apply_blur_effect)
+        result_path = create_partial_id_with_options(image_cv, name_bbox, aadhar_bbox, redaction_option, output_path, apply_blur_effect, fields)
         
         return result_path
         
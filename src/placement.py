@@ -0,0 +1,123 @@
+import math
+import os
+import random
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+from occlusionclient import SCALE_RANGES, top_down_layers
+from sprites import load_index, snap_pose
+
+# The occlusion camera is orthographic and looks straight down, so an occluder's footprint at
+# any rotation/scale is a 2D transform of one silhouette. Coverage of each field is measured on
+# a downscaled raster of the card before anything is sent to Blender.
+RASTER_SCALE = 0.25
+SILHOUETTE_PPU = 200
+# Rough top-down footprints in Blender units at scale 1. Last resort only, for hosts where
+# neither bake_assets.py's top-down layers nor any cached sprite of the object exist.
+FALLBACK_FOOTPRINTS = {"coin": ("disk", 1.0, 1.0), "pen": ("bar", 2.6, 0.18), "pencil": ("bar", 3.2, 0.14)}
+
+def _fallback_silhouette(object_type):
+    shape, length, width = FALLBACK_FOOTPRINTS[object_type]
+    size = int(math.ceil(max(length, width) * SILHOUETTE_PPU)) + 2
+    mask = np.zeros((size, size), dtype=np.float32)
+    center = (size // 2, size // 2)
+    if shape == "disk":
+        cv2.circle(mask, center, int(length * SILHOUETTE_PPU / 2), 1.0, -1)
+    else:
+        half_l, half_w = int(length * SILHOUETTE_PPU / 2), int(width * SILHOUETTE_PPU / 2)
+        mask[center[1] - half_w:center[1] + half_w, center[0] - half_l:center[0] + half_l] = 1.0
+    return mask, SILHOUETTE_PPU, 1.0, 0.0
+
+def top_down_layer(object_type):
+    """
+    A rendered top-down view of the occluder ({sprite_path, shadow_path, ppu, scale, rotation}):
+    the layer baked by bake_assets.py, else any cached sprite of the object, else None.
+    """
+    layer = top_down_layers().get(object_type)
+    if layer is not None:
+        return layer
+    for entry in load_index().get("sprites", {}).values():
+        if entry.get("object_type") == object_type and os.path.exists(entry["sprite_path"]):
+            return entry
+    return None
+
+@lru_cache(maxsize=None)
+def silhouette(object_type):
+    """
+    (mask, ppu, reference scale, reference rotation), loaded once per object type from its
+    top-down layer. Call silhouette.cache_clear() after baking to pick up new layers.
+    """
+    layer = top_down_layer(object_type)
+    if layer is not None:
+        sprite = cv2.imread(layer["sprite_path"], cv2.IMREAD_UNCHANGED)
+        if sprite is not None and sprite.ndim == 3 and sprite.shape[2] == 4:
+            return (sprite[..., 3] > 127).astype(np.float32), layer["ppu"], layer["scale"], layer["rotation"]
+    print(f"Warning: no top-down layer for '{object_type}'; coverage uses a rough footprint. "
+          "Run bake_assets.py in Blender to bake one.")
+    return _fallback_silhouette(object_type)
+
+def pose_matrix(silhouette_size, ppu, ref_scale, ref_rotation, pose, center, width, height, aligned=False,
+                raster_scale=1.0):
+    """
+    2x3 affine from silhouette pixels to card pixels (times raster_scale) for a pose around center.
+    The card plane is 2 Blender units across; by default it is stretched to the image like
+    occlude_render's full renders, with aligned=True pixels are square as in --region_only renders.
+    """
+    grow = pose["scale"] / ref_scale
+    fx = grow * width / (2 * ppu) * raster_scale
+    fy = grow * (width if aligned else height) / (2 * ppu) * raster_scale
+    theta = math.radians(pose.get("rotation", 0) - ref_rotation)
+    # Blender rotates counter-clockwise seen from the camera; image y points down.
+    cos_t, sin_t = math.cos(theta), math.sin(theta)
+    linear = np.array([[fx * cos_t, fx * sin_t], [-fy * sin_t, fy * cos_t]], dtype=np.float64)
+    sil_w, sil_h = silhouette_size
+    dx, dy = pose.get("offset", (0, 0))
+    target = np.array([(center[0] + dx) * raster_scale, (center[1] + dy) * raster_scale])
+    return np.hstack([linear, (target - linear @ np.array([sil_w / 2, sil_h / 2]))[:, None]])
+
+def project(object_type, pose, center, width, height, aligned=False):
+    """Occluder footprint (bool mask) on a card raster of RASTER_SCALE x (width, height)."""
+    mask, ppu, ref_scale, ref_rotation = silhouette(object_type)
+    out_w, out_h = max(1, int(width * RASTER_SCALE)), max(1, int(height * RASTER_SCALE))
+    matrix = pose_matrix((mask.shape[1], mask.shape[0]), ppu, ref_scale, ref_rotation, pose, center,
+                         width, height, aligned, RASTER_SCALE)
+    return cv2.warpAffine(mask, matrix, (out_w, out_h), flags=cv2.INTER_LINEAR) > 0.5
+
+def coverage(footprint, fields):
+    """Fraction of each field box (full-resolution pixels) hidden by the footprint."""
+    result = {}
+    for name, (x1, y1, x2, y2) in fields.items():
+        rx1, ry1 = int(x1 * RASTER_SCALE), int(y1 * RASTER_SCALE)
+        rx2, ry2 = max(rx1 + 1, int(math.ceil(x2 * RASTER_SCALE))), max(ry1 + 1, int(math.ceil(y2 * RASTER_SCALE)))
+        result[name] = float(footprint[ry1:ry2, rx1:rx2].mean()) if footprint[ry1:ry2, rx1:rx2].size else 0.0
+    return result
+
+def solve_pose(object_type, fields, target_field, width, height, coverage_range=(0.4, 0.7), max_other=0.2,
+               attempts=300, aligned=False, sprite_grid=False, rng=random):
+    """
+    Random search for a pose whose footprint hides coverage_range of target_field and at most
+    max_other of every other field. Returns the pose (with its coverage) or None.
+    With sprite_grid, candidates are snapped to the sprite cache's rotation/scale grid before
+    coverage is measured, so the returned pose renders from a sprite exactly as measured.
+    """
+    x1, y1, x2, y2 = fields[target_field]
+    center = ((x1 + x2) / 2, (y1 + y2) / 2)
+    low, high = coverage_range
+    for _ in range(attempts):
+        pose = {
+            "offset": [rng.uniform(-(x2 - x1) / 2, (x2 - x1) / 2), rng.uniform(-(y2 - y1), y2 - y1)],
+            "rotation": rng.uniform(0, 360),
+            "scale": rng.uniform(*SCALE_RANGES[object_type]),
+        }
+        if sprite_grid:
+            _, pose["rotation"], pose["scale"], _ = snap_pose(object_type, pose["rotation"], pose["scale"], 0)
+        covered = coverage(project(object_type, pose, center, width, height, aligned), fields)
+        if not low <= covered[target_field] <= high:
+            continue
+        if any(value > max_other for name, value in covered.items() if name != target_field):
+            continue
+        pose["coverage"] = covered
+        return pose
+    return None
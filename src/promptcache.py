@@ -0,0 +1,94 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import torch
+
+# The UI and the generators reuse a handful of prompt templates, and on CPU the text encoders
+# (CLIP for SD, CLIP + T5 for Flux) are a large share of each call. Encoded prompts are kept in an
+# in-memory LRU keyed by (model, prompt, max_sequence_length) and, if HYPERGEN_PROMPT_CACHE_DIR is
+# set, saved there with torch.save so they survive restarts.
+CACHE_SIZE = int(os.environ.get("HYPERGEN_PROMPT_CACHE_SIZE", "64"))
+CACHE_DIR = os.environ.get("HYPERGEN_PROMPT_CACHE_DIR") or None
+
+class PromptEmbeddingCache:
+    def __init__(self, max_entries=CACHE_SIZE, cache_dir=CACHE_DIR):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()  # key -> tuple of CPU tensors, least recently used first
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        digest = hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.pt")
+
+    def _remember(self, key, tensors):
+        with self._lock:
+            self._entries[key] = tensors
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, model, prompt, max_sequence_length, encode):
+        """
+        Cached output of encode() (a tuple of tensors) for this key; encode is only called on a
+        miss. Tensors are stored on the CPU, callers move them to the pipeline's device.
+        """
+        key = (model, prompt, max_sequence_length)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        if self.cache_dir:
+            path = self._disk_path(key)
+            if os.path.exists(path):
+                try:
+                    tensors = tuple(torch.load(path, map_location="cpu"))
+                    self._remember(key, tensors)
+                    return tensors
+                except Exception as e:
+                    print(f"Ignoring unreadable prompt cache entry {path}: {e}")
+
+        with torch.no_grad():
+            tensors = tuple(t.detach().cpu() for t in encode())
+        self._remember(key, tensors)
+        if self.cache_dir:
+            # Written under a temporary name so a concurrent reader never sees half a file.
+            path = self._disk_path(key)
+            torch.save(tensors, path + ".tmp")
+            os.replace(path + ".tmp", path)
+        return tensors
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+prompt_cache = PromptEmbeddingCache()
+
+def sd_prompt_embeds(pipe, model, prompts, negative_prompt=""):
+    """prompt_embeds / negative_prompt_embeds arguments for a StableDiffusionPipeline call."""
+    device = pipe.device
+    max_length = pipe.tokenizer.model_max_length
+
+    def embed(text):
+        tensors = prompt_cache.get(model, text, max_length,
+                                   lambda: pipe.encode_prompt(text, device, 1, False)[:1])
+        return tensors[0].to(device)
+
+    prompt_embeds = torch.cat([embed(prompt) for prompt in prompts])
+    negative_embeds = embed(negative_prompt).expand(len(prompts), -1, -1)
+    return {"prompt_embeds": prompt_embeds, "negative_prompt_embeds": negative_embeds}
+
+def flux_prompt_embeds(pipe, model, prompt, max_sequence_length=512):
+    """prompt_embeds / pooled_prompt_embeds arguments for a Flux pipeline call."""
+    device = pipe.device
+    prompt_embeds, pooled_embeds = prompt_cache.get(
+        model, prompt, max_sequence_length,
+        lambda: pipe.encode_prompt(prompt=prompt, prompt_2=None, device=device,
+                                   max_sequence_length=max_sequence_length)[:2])
+    return {"prompt_embeds": prompt_embeds.to(device), "pooled_prompt_embeds": pooled_embeds.to(device)}
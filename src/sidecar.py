@@ -0,0 +1,72 @@
+import json
+import os
+
+from fieldmap import FieldMap, FieldResult
+from layoutcache import file_hash
+
+# Generators know exactly where they drew each field, so they record it next to the
+# image. Downstream stages read this instead of re-running OCR on synthetic cards.
+SIDECAR_VERSION = 1
+
+def sidecar_path(image_path):
+    return os.path.splitext(image_path)[0] + ".fields.json"
+
+def write_sidecar(image_path, fields, width, height, source="generator"):
+    """
+    fields: {field_name: {"bbox": [x1, y1, x2, y2], "text": str, "font_size": int}}
+    The image hash is stored so a sidecar left behind by an earlier file is ignored.
+    """
+    payload = {
+        "version": SIDECAR_VERSION,
+        "source": source,
+        "image_sha256": file_hash(image_path),
+        "width": width,
+        "height": height,
+        "fields": {name: info for name, info in fields.items() if info is not None},
+    }
+    path = sidecar_path(image_path)
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2)
+    return path
+
+def load_sidecar(image_path):
+    path = sidecar_path(image_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            payload = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if payload.get("version") != SIDECAR_VERSION:
+        return None
+    if payload.get("image_sha256") != file_hash(image_path):
+        return None
+    return payload
+
+def read_sidecar(image_path):
+    """Returns a FieldMap built from the image's sidecar, or None if there is no valid one."""
+    payload = load_sidecar(image_path)
+    if payload is None:
+        return None
+    fields = FieldMap(payload["width"], payload["height"], source="sidecar")
+    # Generator sidecars are exact; OCR-derived ones carry no confidence of their own.
+    confidence = 1.0 if payload.get("source") == "generator" else None
+    for name, info in payload["fields"].items():
+        fields[name] = FieldResult(info["bbox"], info.get("text"), info.get("confidence", confidence))
+    return fields
+
+def fieldmap_entries(fields):
+    return {
+        name: {"bbox": list(result.bbox), "text": result.text, "confidence": result.confidence}
+        for name, result in fields.items()
+    }
+
+def crop_fields(fields, y_start, y_end, width):
+    """Shifts sidecar field entries into a vertical crop [y_start, y_end) and drops what falls outside."""
+    cropped = {}
+    for name, info in fields.items():
+        x1, y1, x2, y2 = info["bbox"]
+        if y1 >= y_start and y2 <= y_end:
+            cropped[name] = dict(info, bbox=[x1, y1 - y_start, min(x2, width), y2 - y_start])
+    return cropped
@@ -0,0 +1,165 @@
+import json
+import os
+import random
+import tempfile
+import threading
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+from blenderpool import get_blender_pool
+from occlusionclient import baked_asset_paths, SCALE_RANGES
+
+# An occluder's look depends only on its pose and light, not on the card under it.
+# Each pose is rendered once by `occlude_render.py --sprite` into an RGBA sprite and a
+# shadow pass, then composited onto any number of cards with NumPy.
+SPRITE_VERSION = 1
+SPRITE_PPU = 400  # sprite pixels per Blender unit; the card plane is 2 units across
+
+# Poses are snapped to this grid so random occlusions keep hitting the cache.
+ROTATION_STEP = 15
+SCALE_STEP = 0.05
+LIGHT_LEVELS = (250, 350, 450)
+
+_index_lock = threading.Lock()
+
+def ensure_cache_dir():
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp", "sprite_cache")
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+def _index_path():
+    return os.path.join(ensure_cache_dir(), "index.json")
+
+def load_index():
+    try:
+        with open(_index_path()) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return index if index.get("version") == SPRITE_VERSION else {}
+
+def _write_index(index):
+    fd, tmp_path = tempfile.mkstemp(dir=ensure_cache_dir(), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, _index_path())
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+def snap_pose(object_type, rotation, scale, light_energy):
+    rotation = (round(rotation / ROTATION_STEP) * ROTATION_STEP) % 360
+    scale = round(round(scale / SCALE_STEP) * SCALE_STEP, 3)
+    light_energy = min(LIGHT_LEVELS, key=lambda level: abs(level - light_energy))
+    return object_type, int(rotation), max(scale, SCALE_STEP), light_energy
+
+def sprite_key(object_type, rotation, scale, light_energy, profile):
+    return f"{object_type}_r{rotation:03d}_s{scale:.3f}_l{light_energy}_{profile}"
+
+def random_pose(object_type, rng=random):
+    return snap_pose(object_type, rng.uniform(0, 360), rng.uniform(*SCALE_RANGES[object_type]),
+                     rng.choice(LIGHT_LEVELS))
+
+def get_sprite(object_type, rotation, scale, light_energy, blender_executable, occlusion_script, assets,
+               profile="balanced"):
+    """
+    Index entry for the pose, rendering it on the Blender worker pool if it is not cached yet.
+    assets holds the coin/pen/pencil model and texture paths used by occlude_render.
+    """
+    object_type, rotation, scale, light_energy = snap_pose(object_type, rotation, scale, light_energy)
+    key = sprite_key(object_type, rotation, scale, light_energy, profile)
+    with _index_lock:
+        entry = load_index().get("sprites", {}).get(key)
+    if entry and os.path.exists(entry["sprite_path"]) and os.path.exists(entry["shadow_path"]):
+        return entry
+
+    cache_dir = ensure_cache_dir()
+    job = dict(assets, sprite=True, object_type=object_type, rotation=rotation, scale=scale,
+               light_energy=light_energy, profile=profile, sprite_ppu=SPRITE_PPU,
+               sprite_path=os.path.join(cache_dir, f"{key}.png"),
+               shadow_path=os.path.join(cache_dir, f"{key}_shadow.png"))
+    base_scene, asset_library = baked_asset_paths()
+    if base_scene:
+        job.update(base_scene=base_scene, asset_library=asset_library)
+    response = get_blender_pool(blender_executable, occlusion_script).render(job)
+
+    entry = {k: response[k] for k in ("sprite_path", "shadow_path", "size", "extent", "ppu")}
+    entry.update(object_type=object_type, rotation=rotation, scale=scale)
+    with _index_lock:
+        index = load_index()
+        index["version"] = SPRITE_VERSION
+        index.setdefault("sprites", {})[key] = entry
+        _write_index(index)
+    return entry
+
+@lru_cache(maxsize=256)
+def _load_layers(sprite_path, shadow_path):
+    sprite = cv2.imread(sprite_path, cv2.IMREAD_UNCHANGED)
+    shadow = cv2.imread(shadow_path, cv2.IMREAD_UNCHANGED)
+    if sprite is None or shadow is None or sprite.shape[2] != 4 or shadow.shape[2] != 4:
+        raise FileNotFoundError(f"Sprite layers missing or not RGBA: {sprite_path}")
+    color = sprite[..., :3].astype(np.float32)
+    alpha = sprite[..., 3].astype(np.float32) / 255.0
+    # The shadow catcher writes shadow opacity into alpha; turn it into a multiplier.
+    shade = 1.0 - shadow[..., 3].astype(np.float32) / 255.0
+    return color, alpha, shade
+
+def composite_sprite(card, entry, center):
+    """
+    Composites a cached sprite onto a BGR uint8 card in place, centred at center (x, y) px.
+    The card is 2 Blender units across with square pixels, as in occlude_render --region_only,
+    so one pixels-per-unit factor applies to both axes.
+    """
+    color, alpha, shade = _load_layers(entry["sprite_path"], entry["shadow_path"])
+    img_h, img_w = card.shape[:2]
+    factor = img_w / (2 * entry["ppu"])
+    out_w = max(1, int(round(color.shape[1] * factor)))
+    out_h = max(1, int(round(color.shape[0] * factor)))
+    if (out_w, out_h) != (color.shape[1], color.shape[0]):
+        color = cv2.resize(color, (out_w, out_h), interpolation=cv2.INTER_AREA)
+        alpha = cv2.resize(alpha, (out_w, out_h), interpolation=cv2.INTER_AREA)
+        shade = cv2.resize(shade, (out_w, out_h), interpolation=cv2.INTER_AREA)
+
+    x0 = int(round(center[0] - out_w / 2))
+    y0 = int(round(center[1] - out_h / 2))
+    cx0, cy0 = max(0, x0), max(0, y0)
+    cx1, cy1 = min(img_w, x0 + out_w), min(img_h, y0 + out_h)
+    if cx0 >= cx1 or cy0 >= cy1:
+        return card
+    sx0, sy0 = cx0 - x0, cy0 - y0
+    sx1, sy1 = sx0 + (cx1 - cx0), sy0 + (cy1 - cy0)
+
+    region = card[cy0:cy1, cx0:cx1].astype(np.float32)
+    region *= shade[sy0:sy1, sx0:sx1, None]
+    a = alpha[sy0:sy1, sx0:sx1, None]
+    region = region * (1.0 - a) + color[sy0:sy1, sx0:sx1] * a
+    card[cy0:cy1, cx0:cx1] = np.clip(region + 0.5, 0, 255).astype(np.uint8)
+    return card
+
+def occlude_with_sprite(img_path, output_path, object_type, field_bbox, blender_executable, occlusion_script,
+                        assets, profile="balanced", offset=(0, 0), rng=random, pose=None):
+    """
+    Sprite-cache equivalent of run_blender_occlusion: one cached pose over the field. pose
+    (offset, rotation, scale, light_energy) is snapped to the sprite grid; poses from
+    placement.solve_pose(aligned=True, sprite_grid=True) are already on it and render as solved.
+    Without a pose a random one is used.
+    """
+    card = cv2.imread(img_path)
+    if card is None:
+        raise FileNotFoundError(f"Image not found at {img_path}")
+    if pose:
+        offset = pose.get("offset") or offset
+        rotation = pose.get("rotation", 0)
+        scale = pose.get("scale", SCALE_RANGES[object_type][0])
+        sprite_pose = snap_pose(object_type, rotation, scale, pose.get("light_energy") or LIGHT_LEVELS[1])
+    else:
+        sprite_pose = random_pose(object_type, rng)
+    entry = get_sprite(*sprite_pose, blender_executable, occlusion_script, assets, profile)
+    x1, y1, x2, y2 = field_bbox
+    composite_sprite(card, entry, ((x1 + x2) / 2 + offset[0], (y1 + y2) / 2 + offset[1]))
+    cv2.imwrite(output_path, card)
+    return output_path